@@ -0,0 +1,83 @@
+import multiprocessing
+import queue
+import time
+from Shared_ring import Shared_ring
+
+
+class Acquisition_process(multiprocessing.Process):
+    """
+    Acquisition_process class:
+    Process that creates its own data stream and writes every new sample into a Shared_ring. It is the single reader
+    of the data source when the plots are run in separate processes (see Process_hub). The channels the stream is
+    restricted to (see Data_stream.set_projection) can be changed while the process is running by sending them through
+    the control queue with a version number. The first window of a new projection rewrites the ring, which is then
+    tagged with the version, so the readers know which projection the samples were fetched with.
+    """
+    def __init__(self, stream_class, gen_params, ring_name, nb_channels, capacity, interval = 10):
+        """
+        _constructor
+        :param stream_class: Data_stream child class. It is instantiated with gen_params inside the new process
+        :param gen_params: dictonary of parameters needed by the stream
+        :param ring_name: name of the Shared_ring block to write to
+        :param nb_channels: number of channels of the ring
+        :param capacity: capacity of the ring in number of samples
+        :param interval: polling interval in ms
+        """
+        super().__init__(daemon = True)
+        self.stream_class = stream_class
+        self.gen_params = gen_params
+        self.ring_name = ring_name
+        self.nb_channels = nb_channels
+        self.capacity = capacity
+        self.interval = interval
+        self.stop_event = multiprocessing.Event()
+        self.control = multiprocessing.Queue()
+
+    def run(self):
+        """
+        Overwritten function of multiprocessing.Process. Polls the stream and appends the new samples to the ring
+        until stop is called
+        :return: No return
+        """
+        ring = Shared_ring(self.nb_channels, self.capacity, name = self.ring_name)
+        stream = self.stream_class(self.gen_params)
+        stream.set_winLen(self.capacity)
+        last_count = None
+        version = 0
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                version, projection = self.control.get_nowait()
+                stream.set_projection(projection)
+                # The ring is rewritten with the first window of the new projection
+                last_count = None
+            except queue.Empty:
+                pass
+            try:
+                window = stream.get_Array()
+                count = stream.get_Count()
+                if(count is None or last_count is None):
+                    ring.reset()
+                    ring.write(window)
+                    ring.set_tag(version)
+                elif(count > last_count):
+                    ring.write(window[:, max(window.shape[1] - (count - last_count), 0):])
+                last_count = count
+            except Exception as e:
+                print("Acquisition error: {}".format(e))
+            rest = self.interval / 1000 - (time.perf_counter() - start)
+            if(rest > 0):
+                if(hasattr(stream, "wait")):
+                    stream.wait(rest)
+                else:
+                    time.sleep(rest)
+        stream.close()
+        ring.close()
+
+    def stop(self):
+        """
+        Stops the polling loop and waits for the process to finish
+        :return: No return
+        """
+        self.stop_event.set()
+        self.join()
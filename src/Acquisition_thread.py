@@ -0,0 +1,339 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import time
+import threading
+from Stage_timer import Stage_timer
+
+
+class Acquisition_thread(QThread):
+    """
+    Acquisition_thread class:
+    Background loop that owns a Data_stream and polls it at its own rate, independently of the GUI timers. Each new
+    window is copied out of the stream buffer and published as the latest snapshot. The plots only read the latest
+    snapshot when they redraw (stale snapshots are simply overwritten), so a slow query never blocks the GUI thread.
+    The window_ready signal is emitted too for objects that want to be notified of every new window.
+    Several plots can share one thread (and therefore one DB reader). Every plot subscribes with the window length it
+    needs, the stream is queried with the largest one and each plot takes the slice it asked for with get_slice.
+    The thread is started with the first subscription and stopped when the last plot unsubscribes. If the thread owns
+    the stream (close_stream) the stream is closed too at that point, which gives its DB connection back to the pool.
+    A plot that only shows some of the channels subscribes with their numbers, the stream is then restricted to the union
+    of the channels needed by the subscribers (see Data_stream.set_projection).
+    A plot can also subscribe with a processor (feature extraction...) that get_result applies to its slice. Process_hub
+    offers the same interface but runs the processors in separate processes.
+    If the processor of a subscriber has an aggregate feature that the stream can compute at the source (see
+    Data_stream.get_Aggregate), the feature is queried for this subscriber at every poll and get_result returns
+    processor.from_features of it. The raw window is then not needed for this subscriber and is not fetched at all if
+    no other subscriber needs it.
+    Only the thread queries the stream. The functions called by the plots (get_frame, get_slice, get_result) only read
+    what the thread published: if nothing usable was published yet (first window, window of an older projection, new
+    aggregate processor) they wait for the thread to publish it.
+    """
+
+    window_ready = pyqtSignal(object)
+
+    def __init__(self, stream, interval = 10, close_stream = False, timeout = 5):
+        """
+        _constructor
+        :param stream: A Data_stream object. Once the thread is started the stream should only be accessed through
+        this object
+        :param interval: polling interval in ms
+        :param close_stream: if True the stream is closed when the last subscriber unsubscribes
+        :param timeout: maximum time in s a plot waits for the thread to publish a window it can use
+        """
+        super().__init__()
+        self.stream = stream
+        self.interval = interval
+        self.close_stream = close_stream
+        self.default_length = stream.get_winLen()
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # Notified whenever a window or an aggregate is published
+        self.published_cond = threading.Condition()
+        self.snapshot = None
+        self.published = None
+        self.frame = 0
+        self.frames = {}
+        self.count = None
+        self.subscribers = {}
+        self.processors = {}
+        self.projections = {}
+        self.projection = None
+        self.aggregates = {}
+        self.timing = Stage_timer("Acquisition")
+
+    def run(self):
+        """
+        Overwritten function of QThread. Polls the stream until an interruption is requested
+        :return: No return
+        """
+        while not self.isInterruptionRequested():
+            start = time.perf_counter()
+            try:
+                self.poll()
+            except Exception as e:
+                print("Acquisition error: {}".format(e))
+            rest = self.interval - (time.perf_counter() - start) * 1000
+            if(rest > 0):
+                # A stream with queries in flight (Async_DB_stream) wakes the thread as soon as a result arrives
+                if(hasattr(self.stream, "wait")):
+                    self.stream.wait(rest / 1000)
+                else:
+                    self.msleep(int(rest))
+
+    def poll(self):
+        """
+        Requests a window from the stream and publishes a copy of it if new data arrived. The window is published with
+        its count and the projection it was fetched with. The aggregates of the subscribers computed by the stream are
+        queried too.
+        :return: the latest snapshot
+        """
+        self.timing.start()
+        owners = [o for o in list(self.subscribers) if self.is_aggregate(o)]
+        if(len(owners) > 0):
+            self.poll_aggregates(owners)
+            self.timing.mark("aggregate")
+            if(len(owners) == len(self.subscribers)):
+                return self.snapshot
+        with self.lock:
+            window = self.stream.get_Array()
+            count = self.stream.get_Count()
+            projection = self.projection
+            self.timing.mark("fetch")
+            if(count is not None and count == self.count and self.snapshot is not None):
+                return self.snapshot
+            window = window.copy()
+            self.count = count
+        self.timing.mark("copy")
+        # The window, its count and its projection are published together: the incremental processors need the count
+        # and the projection may have changed since the fetch (see get_published)
+        with self.published_cond:
+            self.published = (window, count, projection)
+            self.snapshot = window
+            self.frame = self.frame + 1
+            self.published_cond.notify_all()
+        self.window_ready.emit(window)
+        return window
+
+    def poll_aggregates(self, owners):
+        """
+        Queries the aggregate features of subscribers and publishes them if the newest sample changed
+        :param owners: subscribed objects with an aggregate processor
+        :return: No return
+        """
+        changed = False
+        for owner in owners:
+            processor = self.processors.get(owner)
+            length = self.subscribers.get(owner)
+            if(processor is None or length is None):
+                continue
+            with self.lock:
+                result = self.stream.get_Aggregate(processor.aggregate, length)
+            if(result is None):
+                continue
+            previous = self.aggregates.get(owner)
+            if(previous is None or previous[0] != result[0] or previous[1] is not processor):
+                self.aggregates[owner] = (result[0], processor, result[1])
+                changed = True
+        if(changed):
+            with self.published_cond:
+                self.frame = self.frame + 1
+                self.published_cond.notify_all()
+
+    def is_aggregate(self, owner):
+        """
+        :param owner: the subscribed object
+        :return: True if the feature of the subscriber is computed by the stream
+        """
+        name = getattr(self.processors.get(owner), "aggregate", None)
+        return name is not None and name in self.stream.aggregates
+
+    def latest(self):
+        """
+        Returns the latest snapshot. If no window was acquired yet the function waits for the first one.
+        :return: (channels x samples) array ordered from the oldest to the newest sample
+        """
+        with self.published_cond:
+            self.published_cond.wait_for(lambda: self.snapshot is not None, self.timeout)
+        if(self.snapshot is None):
+            raise RuntimeError("No window was acquired")
+        return self.snapshot
+
+    def covers(self, projection, owner):
+        """
+        :param projection: projection a window was fetched with (None for all the channels)
+        :param owner: the subscribed object
+        :return: True if the rows of all the channels needed by the subscriber were fetched with the projection
+        """
+        if(projection is None):
+            return True
+        needed = self.projections.get(owner)
+        return needed is not None and set(needed).issubset(projection)
+
+    def get_published(self, owner):
+        """
+        Returns the latest published window. A window fetched with a projection that does not contain the channels of
+        the subscriber (it was fetched just before the subscriber changed the projection, its new rows are not filled)
+        is not used, the function waits until the thread publishes a window of the current projection.
+        :param owner: the subscribed object
+        :return: tuple (window, count, projection)
+        """
+        with self.published_cond:
+            self.published_cond.wait_for(lambda: self.published is not None and
+                                         self.covers(self.published[2], owner), self.timeout)
+            published = self.published
+        if(published is None):
+            raise RuntimeError("No window was acquired")
+        return published
+
+    def get_slice(self, owner):
+        """
+        Returns the part of the latest snapshot requested by a subscriber
+        :param owner: the subscribed object
+        :return: (channels x samples) view on the latest snapshot containing the newest samples
+        """
+        return self.get_published(owner)[0][:, -self.subscribers[owner]:]
+
+    def get_result(self, owner):
+        """
+        Applies the processor of a subscriber to its slice of the latest snapshot
+        :param owner: the subscribed object
+        :return: output of the processor, or the slice itself if the subscriber has no processor
+        """
+        processor = self.processors.get(owner)
+        if(self.is_aggregate(owner)):
+            # The aggregate of a new processor is queried by the thread at its next poll
+            with self.published_cond:
+                self.published_cond.wait_for(lambda: self.aggregates.get(owner, (None, None))[1] is processor,
+                                             self.timeout)
+                aggregate = self.aggregates.get(owner)
+            if(aggregate is not None and aggregate[1] is processor):
+                return processor.from_features(aggregate[2])
+        if(processor is None):
+            return self.get_slice(owner)
+        if(getattr(processor, "incremental", False)):
+            window, count, projection = self.get_published(owner)
+            return processor(window[:, -self.subscribers[owner]:], count)
+        return processor(self.get_slice(owner))
+
+    def get_frame(self, owner):
+        """
+        Returns a counter that changes whenever a new snapshot is available. It does not change for a window that does not
+        contain the channels of the subscriber (see get_published).
+        :param owner: the subscribed object
+        :return: frame counter
+        """
+        published = self.published
+        if(published is None or self.is_aggregate(owner) or self.covers(published[2], owner)):
+            self.frames[owner] = self.frame
+        return self.frames.get(owner, 0)
+
+    def get_timers(self):
+        """
+        Returns the Stage_timers of the thread and of its stream
+        :return: list of Stage_timer objects
+        """
+        return [self.timing, getattr(self.stream, "timing", None)]
+
+    def get_channels(self):
+        """
+        Returns the names of the streamed channels
+        :return: list of channel names
+        """
+        return self.stream.get_channels()
+
+    def subscribe(self, owner, length: int, processor = None, channels = None):
+        """
+        Subscribes an object (usually a plot) to the thread or updates the window length it needs. The stream is
+        queried with the largest window length of all the subscribers. The thread is started if it is not running.
+        :param owner: the subscribing object
+        :param length: window length needed by the subscriber in number of elements
+        :param processor: callable applied to the slice of the subscriber by get_result (None for the raw window)
+        :param channels: numbers of the channels the subscriber needs (rows of the window), None for all of them. The
+        other rows of its window may not be updated.
+        :return: No return
+        """
+        self.subscribers[owner] = max(int(length), 1)
+        self.processors[owner] = processor
+        self.projections[owner] = None if channels is None else sorted(set(channels))
+        if(self.is_aggregate(owner)):
+            # The feature is computed by the stream, no raw channel is needed
+            self.projections[owner] = []
+        self.set_winLen(max(self.subscribers.values()))
+        self.update_projection()
+        if(not self.isRunning()):
+            self.start()
+
+    def unsubscribe(self, owner):
+        """
+        Removes a subscriber. The thread is stopped (and the stream closed if close_stream) if no subscriber is left.
+        :param owner: the subscribed object
+        :return: No return
+        """
+        self.subscribers.pop(owner, None)
+        self.processors.pop(owner, None)
+        self.projections.pop(owner, None)
+        self.aggregates.pop(owner, None)
+        self.frames.pop(owner, None)
+        if(len(self.subscribers) == 0):
+            if(self.close_stream):
+                self.close()
+            else:
+                self.stop()
+        else:
+            self.set_winLen(max(self.subscribers.values()))
+            self.update_projection()
+
+    def update_projection(self):
+        """
+        Restricts the stream to the union of the channels needed by the subscribers (all the channels if one of them
+        needs all). The new projection is used from the next poll on.
+        :return: No return
+        """
+        needed = list(self.projections.values())
+        projection = None if any(c is None for c in needed) else sorted(set().union(*needed))
+        with self.lock:
+            if(projection != self.projection):
+                self.stream.set_projection(projection)
+                self.projection = projection
+                self.count = None
+
+    def set_winLen(self, length: int):
+        """
+        Sets the window length of the stream. The new length is used from the next poll on.
+        :param length: window length in number of elements
+        :return: No return
+        """
+        with self.lock:
+            if(length != self.stream.get_winLen()):
+                self.stream.set_winLen(length)
+                self.count = None
+
+    def get_winLen(self):
+        """
+        Returns the current window length
+        :return: window length in number of elements
+        """
+        return self.stream.get_winLen()
+
+    def get_defaultLen(self):
+        """
+        Returns the window length the stream was created with. A new subscriber starts with this length, the current
+        window length is the largest one of the other subscribers.
+        :return: window length in number of elements
+        """
+        return self.default_length
+
+    def stop(self):
+        """
+        Stops the polling loop and waits for the thread to finish
+        :return: No return
+        """
+        self.requestInterruption()
+        self.wait()
+
+    def close(self):
+        """
+        Stops the thread and closes the stream
+        :return: No return
+        """
+        self.stop()
+        self.stream.close()
@@ -0,0 +1,166 @@
+from DB_stream import DB_stream
+from Connection_pool import pool
+from psycopg2 import sql
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import numpy as np
+import select
+import time
+
+
+class Async_DB_stream(DB_stream):
+    """
+    Async_DB_stream class:
+    DB_stream that hides the network latency of the DB by pipelining the incremental queries. It takes depth extra
+    connections in psycopg2 asynchronous mode from the Connection_pool: get_Array never waits for the DB, it only collects the results that have
+    arrived and sends the next query, so a query is always in flight while the window is processed and drawn. The
+    queries are staggered over the connections (one every round trip / depth), so with a remote host a new result
+    arrives depth times per round trip instead of once.
+    A query asks for the rows newer than the last index known when it was sent, results of older queries can therefore
+    overlap with newer ones and only the rows that are not stored yet are kept. The rows are aggregated by the server
+    into one bytea of big-endian float8 values, which is read with numpy without creating a Python object per value.
+    The full window (first call, longer window or new projection) is still fetched synchronously by DB_stream. The
+    asynchronous plan of a projection is prepared on a connection (through the pool, which keeps the plans of the
+    connection) the first time it is used there, results of queries sent with an older projection are dropped.
+    The owner of the stream can call wait instead of sleeping between two calls to be woken up as soon as a result
+    arrives (see Acquisition_thread).
+    """
+    def __init__(self, gen_params, depth = 2, transport = 'copy'):
+        """
+        _constructor
+        Takes the synchronous connection of DB_stream and the asynchronous connections from the Connection_pool
+        :param gen_params: dictonary of parameters needed to connect to DB and to query
+        :param depth: number of asynchronous connections, i.e. maximum number of queries in flight
+        :param transport: transport of the full window fetches (see DB_stream)
+        """
+        super().__init__(gen_params, True, transport)
+
+        self.connections = []
+        for i in range(max(int(depth), 1)):
+            entry = pool.acquire(gen_params["dbparam"], asynchronous = True)
+            self.connections.append({"entry": entry, "conn": entry["conn"], "cur": entry["conn"].cursor(),
+                                     "sent": None, "selection": None})
+        self.round_trip = 0.0
+        self.last_sent = 0.0
+
+    def prepare_statements(self, projection):
+        """
+        Overwritten function from DB_stream that also creates the asynchronous statement of the projection, which
+        returns the rows aggregated into one bytea
+        :param projection: sorted tuple of channel numbers or None for all the channels
+        :return: dictonary of DB_stream.prepare_statements with the asynchronous statement
+        """
+        selection = self.statements.get(projection)
+        if(selection is not None):
+            return selection
+        selection = super().prepare_statements(projection)
+        columns = selection["columns"]
+        fields = sql.SQL(' || ').join(sql.SQL("float8send({}::float8)").format(sql.Identifier(n)) for n in columns)
+        selection["async"] = sql.SQL(
+            "SELECT string_agg({0}, ''::bytea ORDER BY index DESC) FROM (SELECT {1} FROM {2} WHERE subject_id = $1 "
+            "AND condition  = $2 AND index > $3 ORDER BY index DESC LIMIT $4) AS w").format(
+            fields,
+            sql.SQL(', ').join(sql.Identifier(n) for n in columns),
+            sql.Identifier(self.tbname),
+        ).as_string(self.cur)
+        return selection
+
+    def get_Array(self):
+        """
+        Overwritten function from DB_stream. Stores the results of the queries that have arrived and sends the next
+        query without waiting for it.
+        :return: (channels x samples) view on the buffer ordered from the oldest to the newest sample
+        """
+        self.timing.start()
+        if(self.last_index is None or self.window_length > self.window_fetched):
+            index, values = self.fetch_rows(True)
+            self.timing.mark("query")
+            self.store_rows(index, values, True)
+            self.timing.mark("convert")
+        else:
+            self.collect()
+            self.timing.mark("collect")
+            self.send()
+            self.timing.mark("send")
+        return self.buffer.latest(self.window_length)
+
+    def collect(self):
+        """
+        Polls the connections with a query in flight and stores the new rows of the results that are ready. The
+        results are handled in the order in which the queries were sent.
+        :return: No return
+        """
+        pending = sorted((c for c in self.connections if c["sent"] is not None), key = lambda c: c["sent"])
+        for c in pending:
+            try:
+                if(c["conn"].poll() != psycopg2.extensions.POLL_OK):
+                    continue
+                data = c["cur"].fetchone()[0]
+            except psycopg2.Error as e:
+                print("Asynchronous query failed: {}".format(e))
+                c["sent"] = None
+                continue
+            rtt = time.perf_counter() - c["sent"]
+            self.round_trip = rtt if self.round_trip == 0 else 0.8 * self.round_trip + 0.2 * rtt
+            c["sent"] = None
+            if(data is None or c["selection"] is not self.selection):
+                continue
+            rows = np.frombuffer(data, dtype = '>f8').reshape(-1, len(self.selection["columns"]))
+            index = rows[:, 0].astype(np.int64)
+            new = index > self.last_index
+            if(np.any(new)):
+                self.store_rows(index[new], rows[new, 1:].T, False)
+
+    def send(self):
+        """
+        Sends the next query on an idle connection, unless the previous query was sent less than round trip / depth
+        ago
+        :return: No return
+        """
+        if(len(self.connections) == 0):
+            return
+        now = time.perf_counter()
+        if(now - self.last_sent < self.round_trip / len(self.connections)):
+            return
+        for c in self.connections:
+            if(c["sent"] is None):
+                plan = pool.prepare(c["entry"], self.selection["async"])
+                c["cur"].execute("EXECUTE " + plan + " (%s,%s,%s,%s)",
+                                 (self.subj, self.cdt_nb, self.last_index, self.window_length))
+                while c["conn"].poll() == psycopg2.extensions.POLL_WRITE:
+                    select.select([], [c["conn"].fileno()], [])
+                c["sent"] = now
+                c["selection"] = self.selection
+                self.last_sent = now
+                return
+
+    def wait(self, timeout):
+        """
+        Waits until a result arrives on one of the connections or the timeout expires
+        :param timeout: maximum waiting time in s
+        :return: No return
+        """
+        fds = [c["conn"].fileno() for c in self.connections if c["sent"] is not None]
+        if(len(fds) > 0):
+            select.select(fds, [], [], timeout)
+        else:
+            time.sleep(timeout)
+
+    def close(self):
+        """
+        Overwritten function from DB_stream that gives the asynchronous connections and the synchronous one back to the
+        Connection_pool. The queries still in flight are finished first (a connection that fails is closed)
+        :return: No return
+        """
+        for c in self.connections:
+            try:
+                if(c["sent"] is not None):
+                    psycopg2.extras.wait_select(c["conn"])
+                c["cur"].close()
+            except psycopg2.Error as e:
+                print("Asynchronous query failed: {}".format(e))
+                c["conn"].close()
+            pool.release(c["entry"])
+        self.connections = []
+        super().close()
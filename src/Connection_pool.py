@@ -0,0 +1,128 @@
+from bioml import DB_connection as DBC
+import psycopg2
+import psycopg2.extras
+import threading
+
+
+class Connection_pool(object):
+    """
+    Connection_pool class:
+    Keeps the DB connections of the application so that the streams of successive plots reuse a connection instead of
+    opening a new one every time a plot is created. A connection is checked out by one stream at a time (between
+    acquire and release): the streams run in different threads and their queries and transactions must not interleave
+    on one connection. The prepared statements are registered per connection and reused too: a stream asking for a
+    statement that was already prepared on its connection gets the name of the existing plan.
+    Released connections stay open (with their plans) for the next stream using the same connection parameters
+    (dbparam), only the max_idle most recently released ones are kept, the others are closed. close_all closes every
+    connection (end of the application).
+    The pool also keeps the connections in psycopg2 asynchronous mode used by Async_DB_stream, they are only given to
+    the streams that ask for an asynchronous connection.
+    """
+    def __init__(self, max_idle = 4):
+        """
+        _constructor
+        :param max_idle: maximum number of open connections that are not used by any stream
+        """
+        self.max_idle = max_idle
+        self.idle = []
+        self.in_use = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(dbparam):
+        """
+        :param dbparam: dictonary of connection parameters
+        :return: hashable key of the parameters
+        """
+        return tuple(sorted((str(k), str(v)) for k, v in dbparam.items()))
+
+    def acquire(self, dbparam, asynchronous = False):
+        """
+        Checks out a connection for the given parameters: an idle one if there is one, otherwise a new connection
+        :param dbparam: dictonary of connection parameters
+        :param asynchronous: if True the connection is opened in psycopg2 asynchronous mode (it has no engine,
+        exp_info and subj_info)
+        :return: dictonary with the engine, the connection (conn), exp_info, subj_info and the prepared plans
+        """
+        key = (asynchronous,) + self.key(dbparam)
+        with self.lock:
+            for entry in reversed(self.idle):
+                if(entry["key"] == key and not getattr(entry["conn"], "closed", 0)):
+                    self.idle.remove(entry)
+                    self.in_use.append(entry)
+                    return entry
+        if(asynchronous):
+            engine, exp_info, subj_info = None, None, None
+            conn = psycopg2.connect(async_ = 1, **dbparam)
+            psycopg2.extras.wait_select(conn)
+        else:
+            engine, conn, cur, exp_info, subj_info = DBC.connect_DB(dbparam)
+            cur.close()
+        entry = {"key": key, "engine": engine, "conn": conn, "exp_info": exp_info, "subj_info": subj_info,
+                 "plans": {}, "asynchronous": asynchronous}
+        with self.lock:
+            self.in_use.append(entry)
+        return entry
+
+    def prepare(self, entry, statement):
+        """
+        Prepares a statement on a checked out connection, or returns the existing plan if the same statement was
+        already prepared on it. On an asynchronous connection the function waits until the statement is prepared.
+        :param entry: pooled connection returned by acquire
+        :param statement: SQL text of the statement (with $1, $2... parameters)
+        :return: name of the plan to use with EXECUTE
+        """
+        name = entry["plans"].get(statement)
+        if(name is None):
+            name = "plan_{}".format(len(entry["plans"]))
+            cur = entry["conn"].cursor()
+            cur.execute("PREPARE " + name + " AS " + statement)
+            if(entry.get("asynchronous")):
+                psycopg2.extras.wait_select(entry["conn"])
+            cur.close()
+            entry["plans"][statement] = name
+        return name
+
+    def release(self, entry):
+        """
+        Gives a connection back to the pool. It stays open for the next stream, the least recently released idle
+        connections above max_idle are closed. An asynchronous connection must not have a query in flight.
+        :param entry: pooled connection returned by acquire
+        :return: No return
+        """
+        with self.lock:
+            if(entry in self.in_use):
+                self.in_use.remove(entry)
+            if(not getattr(entry["conn"], "closed", 0) and entry not in self.idle):
+                self.idle.append(entry)
+            while len(self.idle) > self.max_idle:
+                self.close_entry(self.idle.pop(0))
+
+    def close_all(self):
+        """
+        Closes every connection of the pool, used or not
+        :return: No return
+        """
+        with self.lock:
+            for entry in self.idle + self.in_use:
+                self.close_entry(entry)
+            self.idle = []
+            self.in_use = []
+
+    @staticmethod
+    def close_entry(entry):
+        """
+        Closes the connection and the engine of a pooled connection
+        :param entry: pooled connection
+        :return: No return
+        """
+        try:
+            entry["conn"].close()
+            if(hasattr(entry["engine"], "dispose")):
+                entry["engine"].dispose()
+        except Exception as e:
+            print("Closing the connection failed: {}".format(e))
+
+
+# Pool shared by all the streams of the application
+pool = Connection_pool()
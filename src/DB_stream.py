@@ -1,20 +1,47 @@
 import pandas as pd
-from bioml import DB_connection as DBC
+from Connection_pool import pool
 from Data_stream import Data_stream
+from Ring_buffer import Ring_buffer
+from Stage_timer import Stage_timer
+from Incremental_features import Incremental_features
 from psycopg2 import sql
 import numpy as np
 import psycopg2
+import time
+import io
 
 class DB_stream(Data_stream):
     """
-    DB_stream class can be thought of as an interface for creating a datastream from a DB. It creates a connection
-    to the Database and prepares statements to query the DB. The queries can then be initiated
+    DB_stream class can be thought of as an interface for creating a datastream from a DB. It takes a connection
+    to the Database from the Connection_pool and prepares statements to query the DB (or reuses the plans already
+    prepared on the pooled connection). The queries can then be initiated. close gives the connection back.
+    The fetched rows are written into a Ring_buffer from which the plots read the window as a (channels x samples)
+    array. In incremental mode the stream only asks the DB for the rows whose index is higher than the last index
+    seen, the new rows are then appended to the buffer which already holds the rest of the window.
+    By default the rows are transferred with COPY ... TO STDOUT (FORMAT binary): all the columns are cast to float8 by
+    the server so every row has the same size, and the binary result is read as a strided numpy array and written
+    into the buffer without creating any Python object per value. If the COPY cannot be used (or a value is NULL) the
+    stream falls back to the prepared statements read with pandas.
+    The queries can be restricted to the channels that are actually displayed (set_projection): the statements of every
+    projection are prepared once and cached, the rows of the buffer that belong to the other channels are set to NaN.
+    The features listed in aggregates can be computed by the server over the newest rows (get_Aggregate), only one row
+    with a value per channel is then transferred instead of the window. The server only computes the running sums of
+    the features, the features are derived from them with the definitions of Incremental_features, so they are the same
+    as the ones computed from the window.
     """
-    def __init__(self, gen_params):
+    copy_signature = b"PGCOPY\n\xff\r\n\x00"
+
+    # Features that can be computed by the server: the ones whose running sum has an SQL expression
+    aggregates = {name: kind for name, kind in Incremental_features.features.items()
+                  if kind in Incremental_features.sql_sums}
+
+    def __init__(self, gen_params, incremental = True, transport = 'copy'):
         """
         _constructor
         creates a connection to the DB and prepares a query statements according to the given parameters
         :param gen_params: dictonary of parameters needed to connect to DB and to query
+        :param incremental: if True only the rows newer than the last fetched index are queried at each call
+        :param transport: 'copy' for the binary COPY transfer or 'pandas' for the prepared statements read with pandas
         """
         super().__init__()
 
@@ -25,34 +52,259 @@ class DB_stream(Data_stream):
         self.subj = gen_params["subj"]
         self.cdt_nb = gen_params["cdt_nb"]
         self.window_length = gen_params["win_len"]
+        self.incremental = incremental
+        self.transport = transport
 
-        engine, conn, cur, exp_info, subj_info = DBC.connect_DB(params)
+        # Locally held window and the state needed to extend it incrementally
+        self.buffer = Ring_buffer(len(self.allchannels) - 1, self.window_length)
+        self.index_buffer = None
+        self.window_fetched = 0
+        self.last_index = None
+        self.nb_received = 0
+        self.statements = {}
+        self.aggregate_plans = {}
+        self.timing = Stage_timer("DB")
 
-        self.engine = engine
-        self.conn = conn
-        self.cur = cur ## Hmmm
+        self.connection = pool.acquire(params)
+        self.engine = self.connection["engine"]
+        self.conn = self.connection["conn"]
+        self.cur = self.conn.cursor()
 
-        snip = sql.SQL(', ').join(sql.Identifier(n) for n in self.allchannels)
+        self.selection = self.prepare_statements(None)
 
-        self.query_statement = sql.SQL(
+    def prepare_statements(self, projection):
+        """
+        Prepares the statements querying the index and a subset of the channels, or takes them from the cache if the
+        projection was already used
+        :param projection: sorted tuple of channel numbers (rows of get_Array) or None for all the channels
+        :return: dictonary with the projection, the queried columns, the rows of the buffer they are written to (None
+        for all), the names of the prepared plans and the COPY statements
+        """
+        selection = self.statements.get(projection)
+        if(selection is not None):
+            return selection
+        if(projection is None):
+            columns = self.allchannels
+        else:
+            columns = np.append(np.array("index"), self.allchannels[1:][list(projection)])
+        snip = sql.SQL(', ').join(sql.Identifier(n) for n in columns)
+
+        query_statement = sql.SQL(
             "SELECT {0} FROM {1} WHERE subject_id = $1 AND condition  = $2 ORDER BY index DESC LIMIT $3 ").format(
             snip,
             sql.Identifier(self.tbname),
         )
-        prepare_statement = "PREPARE myplan AS "
-
-        self.cur.execute(prepare_statement + self.query_statement.as_string(self.cur))
+        inc_statement = sql.SQL(
+            "SELECT {0} FROM {1} WHERE subject_id = $1 AND condition  = $2 AND index > $3 ORDER BY index DESC LIMIT $4 ").format(
+            snip,
+            sql.Identifier(self.tbname),
+        )
 
+        # COPY cannot execute a prepared statement, its parameters are bound on the client side with mogrify
+        casts = sql.SQL(', ').join(sql.SQL("{}::float8").format(sql.Identifier(n)) for n in columns)
+        copy_statement = sql.SQL(
+            "COPY (SELECT {0} FROM {1} WHERE subject_id = %s AND condition  = %s ORDER BY index DESC LIMIT %s) "
+            "TO STDOUT (FORMAT binary)").format(casts, sql.Identifier(self.tbname)).as_string(self.cur)
+        copy_inc_statement = sql.SQL(
+            "COPY (SELECT {0} FROM {1} WHERE subject_id = %s AND condition  = %s AND index > %s ORDER BY index DESC "
+            "LIMIT %s) TO STDOUT (FORMAT binary)").format(casts, sql.Identifier(self.tbname)).as_string(self.cur)
 
+        selection = {"projection": projection,
+                     "columns": columns,
+                     "rows": None if projection is None else np.array(projection, dtype = int),
+                     "plan": pool.prepare(self.connection, query_statement.as_string(self.cur)),
+                     "plan_inc": pool.prepare(self.connection, inc_statement.as_string(self.cur)),
+                     "copy": copy_statement,
+                     "copy_inc": copy_inc_statement}
+        self.statements[projection] = selection
+        return selection
 
+    def get_Aggregate(self, feature_name, length):
+        """
+        Overwritten function from Data_stream that lets the server compute a feature of every channel over the newest
+        rows. The server computes the running sum of the feature (and the number of rows), the feature is derived from
+        it by Incremental_features.feature_value. The aggregate statement of every feature is prepared the first time it
+        is used.
+        :param feature_name: name of the feature (key of aggregates)
+        :param length: number of rows over which the feature is computed
+        :return: tuple (newest index, array of feature values (one per channel)) or None if the feature is not supported
+        or there is no row
+        """
+        if(feature_name not in self.aggregates):
+            return None
+        start = time.perf_counter()
+        plan = self.aggregate_plans.get(feature_name)
+        if(plan is None):
+            expression = sql.SQL(Incremental_features.sql_sums[self.aggregates[feature_name]])
+            fields = sql.SQL(', ').join(expression.format(sql.SQL("{}::float8").format(sql.Identifier(n)))
+                                        for n in self.allchannels[1:])
+            statement = sql.SQL(
+                "SELECT max(index), count(*), {0} FROM (SELECT {1} FROM {2} WHERE subject_id = $1 AND condition  = $2 "
+                "ORDER BY index DESC LIMIT $3) AS w").format(
+                fields,
+                sql.SQL(', ').join(sql.Identifier(n) for n in self.allchannels),
+                sql.Identifier(self.tbname),
+            )
+            plan = pool.prepare(self.connection, statement.as_string(self.cur))
+            self.aggregate_plans[feature_name] = plan
+        self.cur.execute("EXECUTE " + plan + " (%s,%s,%s)", (self.subj, self.cdt_nb, int(length)))
+        row = self.cur.fetchone()
+        self.timing.record("aggregate", time.perf_counter() - start)
+        if(row is None or not row[1]):
+            return None
+        sums = np.array(row[2:], dtype = np.float64)
+        return row[0], Incremental_features.feature_value(feature_name, sums, row[1])
 
+    def set_projection(self, channels):
+        """
+        Overwritten function from Data_stream that restricts the queries to a subset of the channels. If the
+        projection changes the whole window is queried again with the new columns at the next call of get_Array.
+        :param channels: iterable of channel numbers (rows of get_Array) or None for all the channels
+        :return: No return
+        """
+        projection = None
+        if(channels is not None):
+            projection = tuple(sorted(set(int(c) for c in channels)))
+            if(len(projection) == len(self.allchannels) - 1):
+                projection = None
+        if(projection != self.selection["projection"]):
+            self.selection = self.prepare_statements(projection)
+            self.window_fetched = 0
 
     def get_Window(self):
         """
-        Overwritten function from Data_stream that executes the prepared statement with the set parameters.
-        :return: A dataframe with the result from the query
+        Overwritten function from Data_stream that returns the current window as a dataframe. The data is taken from
+        the buffer filled by get_Array.
+        :return: A dataframe with the index and the channels as columns (newest row first)
+        """
+        arr = self.get_Array()
+        window = pd.DataFrame(arr[:, ::-1].T, columns = self.allchannels[1:])
+        window.insert(0, "index", self.index_buffer.latest(arr.shape[1])[0, ::-1])
+        return window
+
+    def get_Array(self):
+        """
+        Overwritten function from Data_stream that executes the prepared statement with the set parameters and writes
+        the result into the buffer. In incremental mode the full window is only queried once (or when a longer window
+        is requested), afterwards only the new rows are fetched.
+        :return: (channels x samples) view on the buffer ordered from the oldest to the newest sample
+        """
+        self.timing.start()
+        full = not self.incremental or self.last_index is None or self.window_length > self.window_fetched
+        index, values = self.fetch_rows(full)
+        self.timing.mark("query")
+        self.store_rows(index, values, full)
+        self.timing.mark("convert")
+        return self.buffer.latest(self.window_length)
+
+    def fetch_rows(self, full):
+        """
+        Queries the whole window or only the new rows, with the binary COPY or with pandas
+        :param full: if True the whole window is queried, otherwise only the rows newer than the last index
+        :return: tuple (index array, (channels x rows) array), both ordered from the newest row
+        """
+        index, values = None, None
+        if(self.transport == 'copy'):
+            index, values = self.copy_rows(full)
+        if(index is None):
+            if(full):
+                rows = self.fetch_Window()
+            else:
+                rows = pd.read_sql_query("EXECUTE " + self.selection["plan_inc"] + " (%s,%s,%s,%s)", self.conn,
+                                         params = (self.subj, self.cdt_nb, self.last_index, self.window_length))
+            index = rows['index'].to_numpy()
+            values = rows[self.selection["columns"][1:]].to_numpy(np.float32).T
+        return index, values
+
+    def store_rows(self, index, values, full):
+        """
+        Writes fetched rows into the buffer. A full window replaces the content of the buffer, otherwise the rows are
+        appended. With a projection only the rows of the selected channels are written, the others stay NaN.
+        :param index: index array ordered from the newest row
+        :param values: (selected channels x rows) array ordered from the newest row
+        :param full: True if the rows are a whole window
+        :return: No return
+        """
+        if(len(index) > 0):
+            if(full):
+                if(self.buffer.capacity < self.window_length):
+                    self.buffer = Ring_buffer(self.buffer.nb_channels, self.window_length)
+                self.buffer.reset(None if self.selection["rows"] is None else np.nan)
+                self.index_buffer = Ring_buffer(1, self.buffer.capacity, dtype = index.dtype)
+                self.window_fetched = self.window_length
+            self.last_index = index[0].item()
+            self.nb_received = self.nb_received + len(index)
+            self.buffer.write(values[:, ::-1], self.selection["rows"])
+            self.index_buffer.write(index[None, ::-1])
+        elif(self.index_buffer is None):
+            self.index_buffer = Ring_buffer(1, self.buffer.capacity)
+
+    def copy_rows(self, full):
+        """
+        Transfers the rows of the window (or only the new rows) with a binary COPY and decodes them. Every row of the
+        binary format is a field count (int16) followed by a length (int32) and a big-endian float8 per column, so the
+        values form a strided array that is read in place.
+        :param full: if True the whole window is queried, otherwise only the rows newer than the last index
+        :return: tuple (index array, (selected channels x rows) array of big-endian float8), both ordered from the
+        newest row, or (None, None) if the COPY is not usable and the stream falls back to pandas
+        """
+        if(full):
+            query = self.cur.mogrify(self.selection["copy"], (self.subj, self.cdt_nb, self.window_length))
+        else:
+            query = self.cur.mogrify(self.selection["copy_inc"], (self.subj, self.cdt_nb, self.last_index,
+                                                                  self.window_length))
+        data = io.BytesIO()
+        try:
+            self.cur.copy_expert(query, data)
+        except psycopg2.Error as e:
+            print("Binary COPY not possible, falling back to pandas: {}".format(e))
+            self.conn.rollback()
+            self.transport = 'pandas'
+            return None, None
+
+        buf = data.getbuffer()
+        nb_fields = len(self.selection["columns"])
+        if(bytes(buf[:11]) != self.copy_signature):
+            self.transport = 'pandas'
+            return None, None
+        start = 19 + int(np.frombuffer(buf, dtype = '>i4', count = 1, offset = 15)[0])
+        row_size = 2 + 12 * nb_fields
+        nb_rows = (len(buf) - start - 2) // row_size
+        if(nb_rows == 0 and len(buf) - start == 2):
+            # No new rows, the result only contains the header and the trailer
+            return np.zeros(0, dtype = np.int64), np.zeros((nb_fields - 1, 0))
+        counts = np.ndarray((nb_rows,), dtype = '>i2', buffer = buf, offset = start, strides = (row_size,))
+        lengths = np.ndarray((nb_rows, nb_fields), dtype = '>i4', buffer = buf, offset = start + 2,
+                             strides = (row_size, 12))
+        if((len(buf) - start - 2) % row_size != 0 or np.any(counts != nb_fields) or np.any(lengths != 8)):
+            # NULL values (length -1) make the rows irregular, they are handled by pandas
+            print("Irregular COPY result, falling back to pandas")
+            self.transport = 'pandas'
+            return None, None
+        values = np.ndarray((nb_fields, nb_rows), dtype = '>f8', buffer = buf, offset = start + 6,
+                            strides = (12, row_size))
+        return values[0].astype(np.int64), values[1:]
+
+    def get_Count(self):
+        """
+        Overwritten function from Data_stream that returns the number of rows received from the DB so far
+        :return: number of rows
+        """
+        return self.nb_received
+
+    def get_channels(self):
+        """
+        Overwritten function from Data_stream that returns the names of the streamed channels
+        :return: list of channel names in the order of the rows of get_Array
+        """
+        return [str(c) for c in self.allchannels[1:]]
+
+    def fetch_Window(self):
+        """
+        Queries the whole window from the DB with the prepared statement
+        :return: A dataframe with the result from the query (newest row first)
         """
-        window = pd.read_sql_query("EXECUTE myplan (%s,%s,%s)", self.conn, params = (self.subj, self.cdt_nb, self.window_length))
+        window = pd.read_sql_query("EXECUTE " + self.selection["plan"] + " (%s,%s,%s)", self.conn, params = (self.subj, self.cdt_nb, self.window_length))
         return window
 
     def set_winLen(self, length: int):
@@ -71,12 +323,13 @@ class DB_stream(Data_stream):
         """
         return self.window_length
 
-
-
-
-
-
-
-
-
-
+    def close(self):
+        """
+        Overwritten function from Data_stream that gives the connection back to the Connection_pool. The stream can not
+        be used afterwards.
+        :return: No return
+        """
+        if(self.connection is not None):
+            self.cur.close()
+            pool.release(self.connection)
+            self.connection = None
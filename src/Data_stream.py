@@ -1,6 +1,65 @@
+import numpy as np
+
+
 class Data_stream(object):
+    """
+    Data_stream class:
+    Base class of the data sources used by the plots. A child class has to overwrite get_Window and can overwrite
+    get_Array to serve the window directly from a buffer (see DB_stream).
+    A stream that can compute simple features at the source lists them in aggregates and overwrites get_Aggregate.
+    """
+    aggregates = {}
+
     def __init__(self):
         pass
 
     def get_Window(self):
         pass
+
+    def get_Array(self):
+        """
+        Returns the current window as an array. By default it is converted from the dataframe of get_Window.
+        :return: (channels x samples) array ordered from the oldest to the newest sample
+        """
+        window = self.get_Window().set_index('index')
+        return window.to_numpy(np.float32)[::-1].T
+
+    def get_Count(self):
+        """
+        Returns the total number of samples received so far. It is used to detect if a new window is available.
+        :return: number of samples or None if the stream cannot tell
+        """
+        return None
+
+    def get_Aggregate(self, feature_name, length):
+        """
+        Computes a feature of every channel over the newest samples at the source, so that the samples do not have to
+        be transferred. Only the features listed in aggregates are supported.
+        :param feature_name: name of the feature
+        :param length: number of samples over which the feature is computed
+        :return: tuple (index of the newest sample, array of feature values (one per channel)) or None
+        """
+        return None
+
+    def set_projection(self, channels):
+        """
+        Restricts the stream to the channels that are needed. The shape of get_Array does not change, the rows of the
+        other channels may not be updated. Streams that always read all the channels ignore it.
+        :param channels: iterable of channel numbers (rows of get_Array) or None for all the channels
+        :return: No return
+        """
+        pass
+
+    def close(self):
+        """
+        Frees the resources of the stream (connections...). Nothing to do by default.
+        :return: No return
+        """
+        pass
+
+    def get_channels(self):
+        """
+        Returns the names of the channels
+        :return: list of channel names in the order of the rows of get_Array
+        """
+        return list(self.get_Window().columns[1:])
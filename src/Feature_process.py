@@ -0,0 +1,96 @@
+import multiprocessing
+import queue
+import time
+from Shared_ring import Shared_ring
+
+
+class Feature_process(multiprocessing.Process):
+    """
+    Feature_process class:
+    Process that reads the newest window of a plot from a Shared_ring, applies the processor of the plot to it (feature
+    extraction, image computation...) and puts the result into a queue with the tag of the samples it was computed from
+    (see Shared_ring). Only the latest result is kept in the queue.
+    The processor can be replaced while the process is running by sending it through the control queue. Every processor
+    has a generation number that is put with its results, so that the results of a replaced processor can be dropped.
+    """
+    def __init__(self, ring_name, nb_channels, capacity, processor, length, interval = 5):
+        """
+        _constructor
+        :param ring_name: name of the Shared_ring block to read from
+        :param nb_channels: number of channels of the ring
+        :param capacity: capacity of the ring in number of samples
+        :param processor: picklable callable taking a (channels x samples) window
+        :param length: initial window length in number of samples
+        :param interval: polling interval in ms
+        """
+        super().__init__(daemon = True)
+        self.ring_name = ring_name
+        self.nb_channels = nb_channels
+        self.capacity = capacity
+        self.processor = processor
+        self.length = multiprocessing.Value('i', int(length))
+        self.interval = interval
+        self.generation = 0
+        self.results = multiprocessing.Queue(maxsize = 1)
+        self.control = multiprocessing.Queue()
+
+    def run(self):
+        """
+        Overwritten function of multiprocessing.Process. Processes every new window until None is received on the
+        control queue
+        :return: No return
+        """
+        ring = Shared_ring(self.nb_channels, self.capacity, name = self.ring_name)
+        processor = self.processor
+        generation = self.generation
+        last = None
+        while True:
+            try:
+                msg = self.control.get_nowait()
+                if(msg is None):
+                    break
+                generation, processor = msg
+                last = None
+            except queue.Empty:
+                pass
+
+            state = (ring.count, self.length.value)
+            if(state != last and ring.count > 0):
+                last = state
+                try:
+                    window, total, tag = ring.read_latest(state[1], total = True, tag = True)
+                    if(getattr(processor, "incremental", False)):
+                        result = processor(window, total)
+                    else:
+                        result = processor(window)
+                    try:
+                        self.results.get_nowait()
+                    except queue.Empty:
+                        pass
+                    self.results.put((generation, tag, result))
+                except Exception as e:
+                    print("Feature process error: {}".format(e))
+            else:
+                time.sleep(self.interval / 1000)
+        ring.close()
+
+    def set_processor(self, processor):
+        """
+        Replaces the processor used by the running process. The results of the previous processor that are still
+        queued are dropped by the generation number.
+        :param processor: picklable callable taking a (channels x samples) window
+        :return: No return
+        """
+        self.processor = processor
+        self.generation = self.generation + 1
+        self.control.put((self.generation, processor))
+
+    def stop(self):
+        """
+        Stops the process and waits for it to finish
+        :return: No return
+        """
+        self.control.put(None)
+        self.join(1)
+        if(self.is_alive()):
+            self.terminate()
@@ -0,0 +1,90 @@
+import bioml.Feature_Extraction as FE
+from Feature_registry import registry
+from Incremental_features import Incremental_features
+import numpy as np
+import time
+
+
+class Feature_processor(object):
+    """
+    Feature_processor class:
+    Feature pipeline of a plot: callable that reduces a (channels x samples) window to one value per channel for every
+    selected feature. It is built once when the features are chosen and reused at every frame. Only the names of the
+    features are stored (the feature objects are resolved through the Feature_registry of the process) so that the
+    object can be sent to a Feature_process.
+    Several features are computed in one pass: the features that can be updated incrementally (see
+    Incremental_features) share one sliding-window engine when the caller passes the stream count with the window, the
+    other features are computed by a single FE.MFE call over the whole window.
+    A feature is only computed incrementally once its incremental definition gave the same values as FE.MFE on a test
+    window (checked once per feature in every process), otherwise it is recomputed over the whole window by FE.MFE.
+    """
+    # The acquisition passes the stream count to incremental processors
+    incremental = True
+
+    def __init__(self, feature_names, fs, timing = None):
+        """
+        _constructor
+        :param feature_names: name of the feature or list of names as defined in FE.DefinedFeatures
+        :param fs: sampling frequency
+        :param timing: Stage_timer in which the duration of the feature extraction is recorded (optional)
+        """
+        if(isinstance(feature_names, str)):
+            feature_names = [feature_names]
+        self.feature_names = tuple(feature_names)
+        self.feature_name = self.feature_names[0]
+        self.fs = fs
+        self.timing = timing
+        incremental = [n for n in self.feature_names if self.confirmed(n, fs)]
+        self.others = tuple(n for n in self.feature_names if n not in incremental)
+        self.engine = Incremental_features(incremental) if len(incremental) > 0 else None
+
+    # Feature name -> True if its incremental definition matches FE.MFE (see confirmed)
+    checked = {}
+
+    @staticmethod
+    def confirmed(name, fs):
+        """
+        Checks the incremental definition of a feature against FE.MFE on a test window. The result is cached.
+        :param name: name of the feature
+        :param fs: sampling frequency
+        :return: True if the feature can be computed by Incremental_features
+        """
+        if(name not in Incremental_features.features):
+            return False
+        ok = Feature_processor.checked.get(name)
+        if(ok is None):
+            # Channels with an offset, so that a variance with or without the mean gives different values
+            window = np.random.RandomState(0).randn(3, 257) + np.array([[0.0], [0.5], [-2.0]])
+            try:
+                expected = np.asarray(FE.MFE(window, registry.resolve((name,)), fs), dtype = np.float64).ravel()
+                ok = bool(np.allclose(Incremental_features([name])(window, None), expected, rtol = 1e-6, atol = 1e-9))
+            except Exception as e:
+                print("The feature {} could not be checked: {}".format(name, e))
+                ok = False
+            if(not ok):
+                print("The incremental {} differs from FE.MFE, it is computed over the whole window".format(name))
+            Feature_processor.checked[name] = ok
+        return ok
+
+    def __call__(self, window, count = None):
+        """
+        Computes the features of every channel
+        :param window: (channels x samples) array
+        :param count: total number of samples received by the stream when the window was taken. If given the
+        incremental features are only updated with the new samples
+        :return: array of feature values, the values of all the channels for every feature one after the other (one
+        value per channel for a single feature)
+        """
+        start = time.perf_counter()
+        if(self.engine is None or count is None):
+            y = FE.MFE(window, registry.resolve(self.feature_names), self.fs)
+        elif(len(self.others) == 0):
+            y = self.engine(window, count)
+        else:
+            values = dict(zip(self.engine.names, np.reshape(self.engine(window, count), (len(self.engine.names), -1))))
+            y = FE.MFE(window, registry.resolve(self.others), self.fs)
+            values.update(zip(self.others, np.reshape(y, (len(self.others), -1))))
+            y = np.concatenate([values[n] for n in self.feature_names])
+        if(self.timing is not None):
+            self.timing.record("feature", time.perf_counter() - start)
+        return y
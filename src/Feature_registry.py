@@ -0,0 +1,48 @@
+import bioml.Feature_Extraction as FE
+
+
+class Feature_registry(object):
+    """
+    Feature_registry class:
+    Single place where the features of FE.DefinedFeatures are looked up. The DefinedFeatures object is created once per
+    process and the feature objects of a list of names are resolved once and cached, so that the processors do not
+    build the definitions and look the features up at every frame.
+    """
+    def __init__(self):
+        """
+        _constructor
+        The definitions are only created when they are used for the first time
+        """
+        self.definitions = None
+        self.resolved = {}
+
+    def get_definitions(self):
+        """
+        :return: the FE.DefinedFeatures object of the process
+        """
+        if(self.definitions is None):
+            self.definitions = FE.DefinedFeatures()
+        return self.definitions
+
+    def names(self):
+        """
+        :return: list of the names of the existing features (in the order of FE.DefinedFeatures)
+        """
+        return [f.name for f in self.get_definitions().get_existing_features()]
+
+    def resolve(self, names):
+        """
+        Returns the feature objects of a tuple of names
+        :param names: tuple of feature names
+        :return: list of feature objects to pass to FE.MFE
+        """
+        features = self.resolved.get(names)
+        if(features is None):
+            definitions = self.get_definitions().features
+            features = [definitions[name] for name in names]
+            self.resolved[names] = features
+        return features
+
+
+# Registry shared by all the processors of the process
+registry = Feature_registry()
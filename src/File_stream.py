@@ -0,0 +1,130 @@
+import pandas as pd
+from Data_stream import Data_stream
+import numpy as np
+import time
+import os
+
+
+class File_stream(Data_stream):
+    """
+    File_stream class:
+    Replays a recorded session from a file as if it was streamed live, so the plots can be used (and load-tested)
+    without a Database. The file is either a .npy array (samples x channels, memory-mapped) or an export of the DB
+    table as .csv or .h5 (HDF5, needs pytables) with an index column and the channel columns. The samples are served at
+    the sampling frequency multiplied by the speed factor, at the end of the file the replay starts again from the
+    beginning if loop is set.
+    """
+    def __init__(self, gen_params, speed = None, loop = True):
+        """
+        _constructor
+        Loads the file given by gen_params["file"]
+        :param gen_params: dictonary of parameters (file, Fs, win_len, channels and optionally speed, subj, cdt_nb)
+        :param speed: replay speed factor, 1 is real time (default gen_params["speed"] or 1)
+        :param loop: if True the replay restarts at the beginning of the file once the end is reached
+        """
+        super().__init__()
+
+        self.path = gen_params["file"]
+        self.fs = gen_params["Fs"]
+        self.window_length = gen_params["win_len"]
+        self.speed = speed if speed is not None else gen_params.get("speed", 1.0)
+        self.loop = loop
+        self.channels = [str(c) for c in gen_params["channels"]]
+
+        ext = os.path.splitext(self.path)[1].lower()
+        if(ext == ".npy"):
+            data = np.load(self.path, mmap_mode = 'r')
+            if(data.ndim != 2 or data.shape[1] < len(self.channels)):
+                raise ValueError("Expected a (samples x channels) array with at least {} channels".format(len(self.channels)))
+            self.data = data[:, :len(self.channels)]
+        else:
+            if(ext in (".h5", ".hdf5")):
+                table = pd.read_hdf(self.path)
+            else:
+                table = pd.read_csv(self.path)
+            # The export can contain the whole table, only the rows of the chosen subject and condition are replayed
+            if("subject_id" in table.columns and "subj" in gen_params):
+                table = table[table["subject_id"].astype(str) == str(gen_params["subj"])]
+            if("condition" in table.columns and "cdt_nb" in gen_params):
+                table = table[table["condition"].astype(str) == str(gen_params["cdt_nb"])]
+            if("index" in table.columns):
+                table = table.sort_values("index")
+            self.data = table[self.channels].to_numpy(np.float32)
+
+        if(len(self.data) == 0):
+            raise ValueError("No samples to replay in {}".format(self.path))
+
+        self.start_time = None
+        self.start_sample = 0
+        self.count = 0
+
+    def position(self):
+        """
+        Returns the number of samples replayed so far. The clock starts at the first call, at which one full window is
+        already available.
+        :return: number of samples
+        """
+        now = time.perf_counter()
+        if(self.start_time is None):
+            self.start_time = now
+            self.start_sample = min(self.window_length, len(self.data))
+        pos = self.start_sample + int((now - self.start_time) * self.fs * self.speed)
+        if(not self.loop):
+            pos = min(pos, len(self.data))
+        return pos
+
+    def get_Array(self):
+        """
+        Overwritten function from Data_stream that returns the samples of the current window
+        :return: (channels x samples) array ordered from the oldest to the newest sample
+        """
+        pos = self.position()
+        self.count = pos
+        n = min(self.window_length, pos, len(self.data))
+        start, stop = (pos - n) % len(self.data), pos % len(self.data)
+        if(stop == 0):
+            stop = len(self.data)
+        if(start < stop):
+            rows = self.data[start:stop]
+        else:
+            rows = np.concatenate((self.data[start:], self.data[:stop]))
+        return np.ascontiguousarray(rows.T, dtype = np.float32)
+
+    def get_Window(self):
+        """
+        Overwritten function from Data_stream that returns the current window as a dataframe
+        :return: A dataframe with the index and the channels as columns (newest row first)
+        """
+        arr = self.get_Array()
+        window = pd.DataFrame(arr[:, ::-1].T, columns = self.channels)
+        window.insert(0, "index", np.arange(self.count - arr.shape[1], self.count)[::-1])
+        return window
+
+    def get_Count(self):
+        """
+        Overwritten function from Data_stream that returns the number of samples replayed up to the last window
+        :return: number of samples
+        """
+        return self.count
+
+    def get_channels(self):
+        """
+        Overwritten function from Data_stream that returns the names of the replayed channels
+        :return: list of channel names in the order of the rows of get_Array
+        """
+        return self.channels
+
+    def set_winLen(self, length: int):
+        """
+        Sets the window length
+        :param length: window_lenght in number of elements
+        :return: No return
+        """
+        self.window_length = length
+
+    def get_winLen(self):
+        """
+        Returns the current window length
+        :return: window length in number of elements
+        """
+        return self.window_length
@@ -0,0 +1,126 @@
+import numpy as np
+import scipy.sparse as sparse
+from scipy.spatial import cKDTree
+
+
+class Grid_interpolator(object):
+    """
+    Grid_interpolator class:
+    Precomputes the image of the heatmap as a linear function of the channel values. Since the sensor layout and the
+    weights do not change while a plot is open, the whole interpolation is stored as a sparse (pixels x channels)
+    matrix and every frame only costs one sparse matrix-vector product.
+    Available methods:
+    - 'kernel': the sensors keep their value and the empty cells get the convolution (with wrap around) of their
+      neighbours divided by the sum of the kernel, like scipy.signal.convolve2d(..., boundary='wrap', mode='same')
+    - 'idw': inverse distance weighting of the nearest sensors
+    - 'gaussian': gaussian radial basis weights of the nearest sensors
+    The image can be upsampled by an integer factor (nearest cell for 'kernel').
+    """
+
+    methods = ['kernel', 'idw', 'gaussian']
+
+    def __init__(self, mtx_form, kernel, method = 'kernel', upsample = 1, neighbours = 4, power = 2, sigma = 1.0):
+        """
+        _constructor
+        Builds the sparse operator
+        :param mtx_form: A matrix containing the channel config information
+        :param kernel: convoltion kernel (used by the 'kernel' method)
+        :param method: one of Grid_interpolator.methods
+        :param upsample: integer upsampling factor of the image
+        :param neighbours: number of nearest sensors used per pixel by 'idw' and 'gaussian'
+        :param power: power of the distance for 'idw'
+        :param sigma: standard deviation (in cells) of the 'gaussian' weights
+        """
+        form = np.asarray(mtx_form)
+        self.method = method
+        self.upsample = max(int(upsample), 1)
+        self.shape = (form.shape[0] * self.upsample, form.shape[1] * self.upsample)
+        self.cells = np.flatnonzero(form)
+        self.chn_idx = form.ravel()[self.cells].astype(int) - 1
+        self.nb_channels = int(form.max()) if form.size > 0 else 0
+
+        if(method == 'kernel'):
+            op = self.kernel_operator(form, np.asarray(kernel))
+            if(self.upsample > 1):
+                rows = np.arange(self.shape[0]) // self.upsample
+                cols = np.arange(self.shape[1]) // self.upsample
+                src = (rows[:, None] * form.shape[1] + cols[None, :]).ravel()
+                op = op.tocsr()[src]
+        elif(method in ('idw', 'gaussian')):
+            op = self.distance_operator(form, method, neighbours, power, sigma)
+        else:
+            raise ValueError("Unknown interpolation method: {}".format(method))
+        self.operator = op.tocsr()
+
+    def kernel_operator(self, form, kernel):
+        """
+        Builds the operator of the 'kernel' method at the resolution of the sensor grid
+        :param form: sensor layout matrix
+        :param kernel: convoltion kernel
+        :return: sparse (cells x channels) matrix
+        """
+        nr, nc = form.shape
+        rows = [self.cells]
+        cols = [self.chn_idx]
+        vals = [np.ones(len(self.cells))]
+
+        occupied = form != 0
+        empty_r, empty_c = np.nonzero(~occupied)
+        kr, kc = kernel.shape
+        for p in range(kr):
+            for q in range(kc):
+                if(kernel[p, q] == 0):
+                    continue
+                # Same indexing as convolve2d(mode='same', boundary='wrap')
+                src_r = (empty_r + (kr - 1) // 2 - p) % nr
+                src_c = (empty_c + (kc - 1) // 2 - q) % nc
+                hit = occupied[src_r, src_c]
+                rows.append(empty_r[hit] * nc + empty_c[hit])
+                cols.append(form[src_r[hit], src_c[hit]].astype(int) - 1)
+                vals.append(np.full(hit.sum(), kernel[p, q] / kernel.sum()))
+
+        return sparse.coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                                 shape = (nr * nc, self.nb_channels))
+
+    def distance_operator(self, form, method, neighbours, power, sigma):
+        """
+        Builds the operator of the 'idw' and 'gaussian' methods at the upsampled resolution
+        :param form: sensor layout matrix
+        :param method: 'idw' or 'gaussian'
+        :param neighbours: number of nearest sensors used per pixel
+        :param power: power of the distance for 'idw'
+        :param sigma: standard deviation (in cells) of the 'gaussian' weights
+        :return: sparse (pixels x channels) matrix
+        """
+        nc = form.shape[1]
+        sensors = np.stack([self.cells // nc, self.cells % nc], axis = 1).astype(float)
+        pr, pc = np.indices(self.shape)
+        pixels = np.stack([(pr.ravel() + 0.5) / self.upsample - 0.5, (pc.ravel() + 0.5) / self.upsample - 0.5], axis = 1)
+
+        k = min(neighbours, len(sensors))
+        d, nearest = cKDTree(sensors).query(pixels, k = k)
+        d = d.reshape(len(pixels), k)
+        nearest = nearest.reshape(len(pixels), k)
+
+        if(method == 'idw'):
+            with np.errstate(divide = 'ignore'):
+                w = 1 / d ** power
+            exact = np.isinf(w)
+            w[exact.any(axis = 1)] = exact[exact.any(axis = 1)]
+        else:
+            # The weights are taken relative to the nearest sensor (its weight is 1), otherwise they all underflow to 0
+            # for a pixel far from every sensor compared to sigma and the pixel becomes NaN
+            w = np.exp(-0.5 * (d ** 2 - d[:, :1] ** 2) / sigma ** 2)
+        w = w / w.sum(axis = 1, keepdims = True)
+
+        rows = np.repeat(np.arange(len(pixels)), k)
+        return sparse.coo_matrix((w.ravel(), (rows, self.chn_idx[nearest].ravel())),
+                                 shape = (len(pixels), self.nb_channels))
+
+    def __call__(self, v):
+        """
+        Computes the image for the given channel values
+        :param v: array of channel values
+        :return: image matrix
+        """
+        return (self.operator @ np.asarray(v)[:self.nb_channels]).reshape(self.shape)
@@ -0,0 +1,67 @@
+from Feature_processor import Feature_processor
+from Grid_interpolator import Grid_interpolator
+import numpy as np
+import time
+
+
+class Heatmap_processor(Feature_processor):
+    """
+    Heatmap_processor class:
+    Callable that computes the image of RT_Heatmap from a window: the feature of every channel is placed on the sensor
+    grid and the empty cells are filled by a precomputed Grid_interpolator (by default the convolution average of
+    their neighbours).
+    With several features one image is built per feature and the images are shown side by side, each scaled by its
+    largest absolute value since the features have different units.
+    With pushdown the processor asks the acquisition to let the data source compute the feature (aggregate, see
+    Data_stream.get_Aggregate), the image is then built from the features with from_features. If the source cannot
+    compute the feature (or several features are selected) the processor is applied to the window as usual.
+    """
+    def __init__(self, feature_names, fs, mtx_form, kernel, interpolation = 'kernel', upsample = 1, timing = None,
+                 pushdown = False):
+        """
+        _constructor
+        :param feature_names: name of the feature or list of names as defined in FE.DefinedFeatures
+        :param fs: sampling frequency
+        :param mtx_form: A matrix containing the channel config information
+        :param kernel: convoltion kernel
+        :param interpolation: interpolation method (see Grid_interpolator)
+        :param upsample: upsampling factor of the image
+        :param timing: Stage_timer in which the durations of the feature extraction and image build are recorded
+        :param pushdown: if True the feature is computed by the data source when it can
+        """
+        super().__init__(feature_names, fs, timing)
+        # Only a feature whose definition was checked against FE.MFE (see Feature_processor) is left to the source
+        self.aggregate = self.feature_name if pushdown and self.others == () and len(self.feature_names) == 1 else None
+        self.mtx_form = mtx_form
+        self.kernel = kernel
+        self.interpolator = Grid_interpolator(mtx_form, kernel, interpolation, upsample)
+
+    def __call__(self, window, count = None):
+        """
+        Computes the image of the heatmap
+        :param window: (channels x samples) array
+        :param count: total number of samples received by the stream (see Feature_processor)
+        :return: tuple (feature vector, image matrix)
+        """
+        return self.from_features(super().__call__(window, count))
+
+    def from_features(self, y):
+        """
+        Computes the image of the heatmap from the feature vector
+        :param y: array of feature values (one per channel for every feature)
+        :return: tuple (feature vector, image matrix)
+        """
+        start = time.perf_counter()
+        if(len(self.feature_names) == 1):
+            output = self.interpolator(y)
+        else:
+            images = []
+            for v in np.reshape(y, (len(self.feature_names), -1)):
+                img = self.interpolator(v)
+                scale = np.max(np.abs(img)) if img.size > 0 else 0
+                images.append(img / scale if scale > 0 else img)
+                images.append(np.zeros((img.shape[0], 1)))
+            output = np.concatenate(images[:-1], axis = 1)
+        if(self.timing is not None):
+            self.timing.record("image", time.perf_counter() - start)
+        return y, output
@@ -0,0 +1,124 @@
+from Ring_buffer import Ring_buffer
+import numpy as np
+
+
+class Incremental_features(object):
+    """
+    Incremental_features class:
+    Sliding-window feature extraction. Instead of recomputing the features over the whole window at every frame, the
+    running sums of every channel (absolute values, squares, absolute differences and sign changes of consecutive
+    samples) are updated with the samples that entered the window and the samples that left it, so a frame costs
+    O(new samples) whatever the window length. The engine keeps its own copy of the window to know which samples
+    leave it.
+    The caller passes the total number of samples received so far (stream count) with every window, the difference to
+    the previous count is the number of new samples. The sums are recomputed from the whole window when the window
+    length changes, when the count is unknown or when the window was replaced (more new samples than its length), and
+    once every window length of new samples so that rounding errors do not accumulate.
+    The names of the features are the ones of FE.DefinedFeatures, the other features are not supported (see
+    Feature_processor which falls back to FE.MFE for them). The definitions of feature_value are checked against FE.MFE
+    by Feature_processor before a feature is computed incrementally.
+    """
+    # Features that can be updated incrementally and the running sum each of them needs
+    features = {"MAV": "abs", "RMS": "square", "VAR": "square", "WL": "diff", "ZC": "crossing"}
+    # SQL expressions of the running sums that a DB server can compute over a column ({0}), see DB_stream.get_Aggregate
+    sql_sums = {"abs": "sum(abs({0}))", "square": "sum({0} * {0})"}
+
+    def __init__(self, feature_names):
+        """
+        _constructor
+        :param feature_names: list of names of supported features (keys of features)
+        """
+        for name in feature_names:
+            if(name not in self.features):
+                raise ValueError("The feature {} cannot be computed incrementally".format(name))
+        self.names = list(feature_names)
+        self.sums = {self.features[name]: None for name in self.names}
+        self.buffer = None
+        self.count = None
+        self.since_sync = 0
+
+    @staticmethod
+    def contributions(kind, x):
+        """
+        Computes the contribution of every sample to a running sum
+        :param kind: kind of running sum ("abs", "square", "diff" or "crossing")
+        :param x: (channels x n) array. For "diff" and "crossing" the first sample is only used as predecessor of the
+        second one
+        :return: sum of the contributions of every channel
+        """
+        if(kind == "abs"):
+            return np.abs(x).sum(axis = 1)
+        if(kind == "square"):
+            return np.square(x).sum(axis = 1)
+        if(kind == "diff"):
+            return np.abs(np.diff(x, axis = 1)).sum(axis = 1)
+        return (x[:, 1:] * x[:, :-1] < 0).sum(axis = 1).astype(np.float64)
+
+    def reset(self, window):
+        """
+        Copies the window and computes all the running sums over it
+        :param window: (channels x samples) array ordered from the oldest to the newest sample
+        :return: No return
+        """
+        nb_channels, length = window.shape
+        if(self.buffer is None or self.buffer.nb_channels != nb_channels or self.buffer.capacity != length):
+            self.buffer = Ring_buffer(nb_channels, length, dtype = np.float64)
+        self.buffer.reset()
+        self.buffer.write(window)
+        for kind in self.sums:
+            self.sums[kind] = self.contributions(kind, self.buffer.latest(length))
+        self.since_sync = 0
+
+    def __call__(self, window, count):
+        """
+        Updates the running sums with the new samples of the window and returns the features
+        :param window: (channels x samples) array ordered from the oldest to the newest sample
+        :param count: total number of samples received when the window was taken (None if unknown)
+        :return: array of feature values, the values of all the channels for every feature one after the other
+        """
+        length = window.shape[1]
+        new = None if count is None or self.count is None else count - self.count
+        if(new is None or new < 0 or new >= length or self.buffer is None or self.buffer.capacity != length or
+                self.buffer.nb_channels != window.shape[0] or len(self.buffer) < length or
+                self.since_sync + new >= length):
+            self.reset(window)
+        elif(new > 0):
+            old = self.buffer.latest(length)
+            leaving = old[:, :new + 1]
+            entering = np.concatenate((old[:, -1:], window[:, -new:]), axis = 1)
+            for kind in self.sums:
+                if(kind in ("abs", "square")):
+                    self.sums[kind] += self.contributions(kind, entering[:, 1:]) - \
+                                       self.contributions(kind, leaving[:, :-1])
+                else:
+                    self.sums[kind] += self.contributions(kind, entering) - self.contributions(kind, leaving)
+            self.buffer.write(window[:, -new:])
+            self.since_sync = self.since_sync + new
+        self.count = count
+        return np.concatenate([self.value(name, length) for name in self.names])
+
+    def value(self, name, length):
+        """
+        Computes a feature from its running sum
+        :param name: name of the feature
+        :param length: window length
+        :return: array of the feature values of every channel
+        """
+        return self.feature_value(name, self.sums[self.features[name]], length)
+
+    @staticmethod
+    def feature_value(name, s, length):
+        """
+        Definition of the features in terms of their running sum
+        :param name: name of the feature
+        :param s: array of the running sums of every channel (the kind given by features)
+        :param length: number of samples the sums are computed over
+        :return: array of the feature values of every channel
+        """
+        if(name == "MAV"):
+            return s / length
+        if(name == "RMS"):
+            return np.sqrt(np.maximum(s, 0) / length)
+        if(name == "VAR"):
+            return np.maximum(s, 0) / max(length - 1, 1)
+        return s.copy()
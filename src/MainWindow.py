@@ -1,6 +1,12 @@
 from PyQt5 import QtGui
-from PyQt5.QtWidgets import QApplication, QMainWindow,QMessageBox
+from PyQt5.QtWidgets import QApplication, QMainWindow,QMessageBox,QFileDialog
 from DB_stream import DB_stream
+from Async_DB_stream import Async_DB_stream
+from File_stream import File_stream
+from Synthetic_stream import Synthetic_stream
+from Acquisition_thread import Acquisition_thread
+from Process_hub import Process_hub
+from Connection_pool import pool
 
 from MUI import Ui_MainWindow
 from map_input import HM_input_dialog
@@ -20,6 +26,14 @@ class MainWindow(QMainWindow):
     correspond to the values saved from the last execution (saved to default_par.txt). One could still change the
     parameters using the GUI. Once the Create_plot button is pressed all the parameters are saved and passed to the
     DB_stream class to initiate a connection with the DB. If successful a Plot is created according to the inputs.
+    All the open plots share one Acquisition_thread (and therefore one DB connection) as long as the parameters do not
+    change, so the different plots can be shown at the same time. The DB connections are kept in a Connection_pool, so a
+    new plot with the same parameters does not have to reconnect, and are closed with the main window. If "Run plots in separate processes" is checked a
+    Process_hub is used instead: the DB is read in its own process and the computations of every plot run in separate
+    processes.
+    Instead of the DB a recorded session can be replayed from a file (see File_stream), optionally faster than real time, or a synthetic EMG
+    signal can be generated (see Synthetic_stream) to try out the plots without any recording. With "Pipelined DB
+    queries" the DB is read by an Async_DB_stream that keeps queries in flight to hide the latency of a remote host.
     For a Serial(Arduino) datasource implementation one would have to add separate default
     parameter_file and slightly change the code (some if statements) etc. Additionally one would also have to add a Serial
     stream class as an Attribute. This class is not coded yet but could be a child of the Data_stream class.
@@ -70,10 +84,17 @@ class MainWindow(QMainWindow):
         self.ui_form.Channel_LE.setText(self.general_param["channels"][0][:-1])
         self.ui_form.Channel_SpinBox.setValue(len(self.general_param["channels"]))
         self.ui_form.FsSpin.setValue(int(self.general_param["Fs"]))
+        self.ui_form.File_LE.setText(self.general_param.get("file", ""))
+        self.ui_form.SpeedSpin.setRange(0.1, 100)
+        self.ui_form.SpeedSpin.setValue(self.general_param.get("speed", 1.0))
+        self.ui_form.File_Bttn.clicked.connect(self.browse_file)
 
 
         self.stream = None
-        self.H_map = None   ##For multiple plots a vector of H_map would be a better idea. However multiplrocessing would be needed too.
+        self.acq = None
+        self.acq_param = None
+        self.acquisitions = []   # All the acquisitions created, the ones of older parameters may still feed open plots
+        self.H_map = None   ##For multiple plots of the same type a vector of H_map would be a better idea.
         self.L_map = None
         self.LR_map = None
         self.F_map = None
@@ -85,7 +106,7 @@ class MainWindow(QMainWindow):
         optionality is added then one could also rename the function and set the serial parameters here too.
         :return: No return
         """
-        if(self.ui_form.DB_radio_bttn.isChecked()):
+        if(not self.ui_form.Serial_radiobttn.isChecked()):
             self.general_param["dbparam"]["dbname"] = self.ui_form.DB_name_LE.text()
             self.general_param["dbparam"]["user"] = self.ui_form.User_LE.text()
             self.general_param["dbparam"]["host"] = self.ui_form.Host_LE.text()
@@ -101,19 +122,56 @@ class MainWindow(QMainWindow):
                 channels.append(self.ui_form.Channel_LE.text() + str(i))
             self.general_param["channels"] = channels
 
+        if(self.ui_form.File_radio_bttn.isChecked()):
+            self.general_param["file"] = self.ui_form.File_LE.text()
+        self.general_param["speed"] = self.ui_form.SpeedSpin.value()
+
         print(self.general_param)
 
+    def browse_file(self):
+        """
+        Slot that lets the user choose the file to replay
+        :return: No return
+        """
+        path, _ = QFileDialog.getOpenFileName(self, "Replay file", "", "Recordings (*.npy *.csv *.h5 *.hdf5)")
+        if(path):
+            self.ui_form.File_LE.setText(path)
+            self.ui_form.File_radio_bttn.setChecked(True)
+
 
 
     def establish_connection(self):
         """
-        Tries to initialise a DB_stream, in other words tries to establish a DB conncetion with given params
-        At the moment only possible with DB_stream. Note if a serial optionality is added one could set self.stream
+        Tries to initialise a DB_stream, in other words tries to establish a DB conncetion with given params, or a
+        File_stream/Synthetic_stream if "Replay file"/"Synthetic signal" is chosen. Note if a serial optionality is added one could set self.stream
         to a serial stream class under an if condition.
+        If an acquisition thread with the same parameters is still running (other plots are open) it is reused instead
+        of opening a new connection. The acquisitions that have no plot left are closed, the others are kept running
+        for their plots and closed with the main window.
         :return: No return
         """
+        multiprocess = self.ui_form.Process_CheckBox.isChecked()
+        stream_class = DB_stream
+        if(self.ui_form.Async_CheckBox.isChecked()):
+            stream_class = Async_DB_stream
+        if(self.ui_form.File_radio_bttn.isChecked()):
+            stream_class = File_stream
+        elif(self.ui_form.Synthetic_radio_bttn.isChecked()):
+            stream_class = Synthetic_stream
+        param = str(self.general_param) + str(multiprocess) + stream_class.__name__
+        if(self.acq is not None and len(self.acq.subscribers) > 0 and self.acq_param == param):
+            return True
+        for acq in [a for a in self.acquisitions if len(a.subscribers) == 0]:
+            acq.close()
+            self.acquisitions.remove(acq)
+        self.acq = None
         try:
-            self.stream = DB_stream(self.general_param)
+            if(multiprocess):
+                self.stream = None
+                self.acq = Process_hub(stream_class, dict(self.general_param))
+            else:
+                self.stream = stream_class(self.general_param)
+                self.acq = Acquisition_thread(self.stream, close_stream = True)
         except:
             wrn = QMessageBox(self)
             wrn.setWindowTitle("Connection Error")
@@ -122,6 +180,8 @@ class MainWindow(QMainWindow):
             button = wrn.exec_()
             print(self.stream)
             return False
+        self.acquisitions.append(self.acq)
+        self.acq_param = param
         return True
 
     def create_plot(self):
@@ -143,7 +203,7 @@ class MainWindow(QMainWindow):
         if (self.establish_connection()):
             m = HM_input_dialog.get_inp_matrix(self.nb_chn)
             if (m.size > 0 and np.any(m) and self.H_map is None):
-                self.H_map = RT_Heatmap(self.stream, m, fs = self.ui_form.FsSpin.value())
+                self.H_map = RT_Heatmap(self.stream, m, fs = self.ui_form.FsSpin.value(), acquisition = self.acq)
                 self.H_map.show()
                 self.H_map.close_request.connect(self.close_Hmap)
 
@@ -164,7 +224,7 @@ class MainWindow(QMainWindow):
         self.set_DBparams()
         self.update_parFile()
         if (self.establish_connection()):
-            self.L_map = RT_Lineplot(self.stream, fs = self.ui_form.FsSpin.value())
+            self.L_map = RT_Lineplot(self.stream, fs = self.ui_form.FsSpin.value(), acquisition = self.acq)
             self.L_map.show()
             self.L_map.close_request.connect(self.close_Lplot)
 
@@ -184,7 +244,7 @@ class MainWindow(QMainWindow):
         self.set_DBparams()
         self.update_parFile()
         if (self.establish_connection()):
-            self.LR_map = RT_Lineplot_Raw(self.stream, fs=self.ui_form.FsSpin.value())
+            self.LR_map = RT_Lineplot_Raw(self.stream, fs=self.ui_form.FsSpin.value(), acquisition = self.acq)
             self.LR_map.show()
             self.LR_map.close_request.connect(self.close_LRplot)
 
@@ -204,7 +264,7 @@ class MainWindow(QMainWindow):
         self.set_DBparams()
         self.update_parFile()
         if (self.establish_connection()):
-            self.F_map = RT_Fourier_Raw(self.stream, fs=self.ui_form.FsSpin.value())
+            self.F_map = RT_Fourier_Raw(self.stream, fs=self.ui_form.FsSpin.value(), acquisition = self.acq)
             self.F_map.show()
             self.F_map.close_request.connect(self.close_Fplot)
 
@@ -216,6 +276,19 @@ class MainWindow(QMainWindow):
         self.F_map.close
         self.F_map = None
 
+    def closeEvent(self, event):
+        """
+        Overwritten function of QMainWindow. Closes all the acquisitions and all the pooled DB connections
+        :param event: close event
+        :return: No return
+        """
+        for acq in self.acquisitions:
+            acq.close()
+        self.acquisitions = []
+        self.acq = None
+        pool.close_all()
+        super().closeEvent(event)
+
     def update_parFile(self):
         """
         Saves the used parameters (DB option) to default_par.txt. So that the parameters can be defaulted with the same
@@ -0,0 +1,107 @@
+from Ring_buffer import Ring_buffer
+import numpy as np
+import time
+
+
+class Minmax_decimator(object):
+    """
+    Minmax_decimator class:
+    Peak preserving decimation of the raw window before it is drawn. The window is cut into buckets of consecutive
+    samples and every bucket is replaced by its minimum and its maximum, so a window of any length is drawn with about
+    2 points per bucket (the plots use one bucket per pixel) and the spikes of the signal stay visible.
+    The buckets are aligned on the total number of samples received (stream count): a complete bucket never changes
+    while it is in the window, so its minimum and maximum are kept from one frame to the next and only the buckets of
+    the new samples are computed. Only the two partial buckets at the ends of the window are computed at every frame.
+    Like Feature_processor the object is a processor of Acquisition_thread / Process_hub that is called with the
+    window and the stream count.
+    """
+    # The acquisition passes the stream count to incremental processors
+    incremental = True
+
+    def __init__(self, nb_buckets, rows = None, timing = None):
+        """
+        _constructor
+        :param nb_buckets: maximum number of buckets of a window (about the width of the plot in pixels)
+        :param rows: rows of the window (channels) to decimate, None for all of them
+        :param timing: Stage_timer in which the duration of the decimation is recorded (optional)
+        """
+        self.nb_buckets = max(int(nb_buckets), 1)
+        self.rows = None if rows is None else list(rows)
+        self.timing = timing
+        self.size = None
+        self.mins = None
+        self.maxs = None
+        self.end = None
+
+    def __call__(self, window, count = None):
+        """
+        Decimates the window
+        :param window: (channels x samples) array ordered from the oldest to the newest sample
+        :param count: total number of samples received by the stream when the window was taken. If None the buckets
+        are aligned on the start of the window and nothing is kept for the next call
+        :return: (x, y) with x the positions of the points in samples from the start of the window (the minimum of a
+        bucket at its first sample, the maximum at its last one, so that the x range is the one of the window) and y
+        the (rows x points) decimated values. x is None if the window is short enough to be drawn as it is (y is then the
+        window itself)
+        """
+        start = time.perf_counter()
+        # The rows are selected on the parts of the window that are read, not on the whole window
+        rows = slice(None) if self.rows is None else self.rows
+        n = window.shape[1]
+        nb_channels = window.shape[0] if self.rows is None else len(self.rows)
+        size = -(-n // self.nb_buckets)
+        if(size <= 2):
+            return None, window[rows]
+
+        # Absolute number of the first sample of the window, the complete buckets are the numbers first to end - 1
+        origin = 0 if count is None else count - n
+        first = -(-origin // size)
+        end = (origin + n) // size
+        if(count is None or self.size != size or self.mins is None or self.mins.nb_channels != nb_channels or
+                self.end is None or self.end > end or self.end < first):
+            self.reset(nb_channels, size)
+            self.end = first
+        if(end > self.end):
+            block = window[rows, self.end * size - origin:end * size - origin].reshape(nb_channels, -1, size)
+            self.mins.write(block.min(axis = 2))
+            self.maxs.write(block.max(axis = 2))
+            self.end = end
+
+        low = [self.mins.latest(end - first)]
+        high = [self.maxs.latest(end - first)]
+        starts = [np.arange(first, end) * size - origin]
+        if(first * size > origin):
+            head = window[rows, :first * size - origin]
+            low.insert(0, head.min(axis = 1, keepdims = True))
+            high.insert(0, head.max(axis = 1, keepdims = True))
+            starts.insert(0, [0])
+        if(end * size < origin + n):
+            tail = window[rows, end * size - origin:]
+            low.append(tail.min(axis = 1, keepdims = True))
+            high.append(tail.max(axis = 1, keepdims = True))
+            starts.append([end * size - origin])
+
+        low = np.concatenate(low, axis = 1)
+        y = np.empty((nb_channels, 2 * low.shape[1]), dtype = window.dtype)
+        y[:, 0::2] = low
+        y[:, 1::2] = np.concatenate(high, axis = 1)
+        x = np.empty(y.shape[1], dtype = np.float64)
+        x[0::2] = np.concatenate(starts)
+        x[1::2] = np.append(x[2::2], n) - 1
+        if(self.timing is not None):
+            self.timing.record("decimate", time.perf_counter() - start)
+        return x, y
+
+    def reset(self, nb_channels, size):
+        """
+        Forgets the kept buckets
+        :param nb_channels: number of decimated channels
+        :param size: number of samples per bucket
+        :return: No return
+        """
+        if(self.mins is None or self.mins.nb_channels != nb_channels):
+            self.mins = Ring_buffer(nb_channels, self.nb_buckets + 2, dtype = np.float64)
+            self.maxs = Ring_buffer(nb_channels, self.nb_buckets + 2, dtype = np.float64)
+        self.mins.reset()
+        self.maxs.reset()
+        self.size = size
@@ -0,0 +1,250 @@
+import queue
+import time
+from Shared_ring import Shared_ring
+from Acquisition_process import Acquisition_process
+from Feature_process import Feature_process
+
+
+class Process_hub(object):
+    """
+    Process_hub class:
+    Multi-process counterpart of Acquisition_thread with the same subscription interface. One Acquisition_process
+    writes the raw samples into a Shared_ring and every subscribed plot that has a processor gets its own
+    Feature_process, so the feature computation of the different plots runs on several cores instead of competing with
+    the Qt event loop for the GIL. Plots without processor read their raw window directly from the ring.
+    The acquisition process is restricted to the union of the channels needed by the subscribers. Every projection sent
+    to the process has a version and the ring is tagged with the version of the samples it holds: until the ring holds
+    samples of a projection that contains the channels of a subscriber, the subscriber gets no new frame and keeps its
+    previous result.
+    """
+    def __init__(self, stream_class, gen_params, capacity = None, interval = 10):
+        """
+        _constructor
+        Creates the shared ring and starts the acquisition process
+        :param stream_class: Data_stream child class instantiated with gen_params in the acquisition process
+        :param gen_params: dictonary of parameters needed by the stream
+        :param capacity: capacity of the ring in number of samples (default 10 s of data)
+        :param interval: polling interval of the acquisition process in ms
+        """
+        self.gen_params = gen_params
+        self.channels = list(gen_params["channels"])
+        self.window_length = gen_params["win_len"]
+        self.default_length = gen_params["win_len"]
+        if(capacity is None):
+            capacity = int(10 * gen_params["Fs"]) + 1
+        self.ring = Shared_ring(len(self.channels), capacity)
+        self.acq_process = Acquisition_process(stream_class, gen_params, self.ring.name, len(self.channels),
+                                               capacity, interval)
+        self.acq_process.start()
+        self.subscribers = {}
+        self.workers = {}
+        self.results = {}
+        self.frames = {}
+        self.projections = {}
+        self.projection = None
+        self.version = 0
+        self.required = {}
+        self.slices = {}
+        self.wait_data()
+
+    def wait_data(self, timeout = 20):
+        """
+        Waits until the acquisition process has written its first samples
+        :param timeout: maximum waiting time in s
+        :return: No return. Raises a RuntimeError if no data arrived in time
+        """
+        start = time.perf_counter()
+        while self.ring.count == 0:
+            if(not self.acq_process.is_alive() or time.perf_counter() - start > timeout):
+                self.stop()
+                raise RuntimeError("The acquisition process did not deliver any data")
+            time.sleep(0.01)
+
+    def get_channels(self):
+        """
+        Returns the names of the streamed channels
+        :return: list of channel names
+        """
+        return self.channels
+
+    def get_timers(self):
+        """
+        Returns the Stage_timers of the hub. The acquisition and the processors run in other processes, their timings
+        are not available here.
+        :return: empty list
+        """
+        return []
+
+    def get_winLen(self):
+        """
+        Returns the largest window length requested by the subscribers
+        :return: window length in number of elements
+        """
+        return self.window_length
+
+    def get_defaultLen(self):
+        """
+        Returns the window length of the parameters of the stream. A new subscriber starts with this length.
+        :return: window length in number of elements
+        """
+        return self.default_length
+
+    def subscribe(self, owner, length: int, processor = None, channels = None):
+        """
+        Subscribes a plot or updates its window length and processor. A plot with a processor gets its own
+        Feature_process.
+        :param owner: the subscribing object
+        :param length: window length needed by the subscriber in number of elements
+        :param processor: picklable callable applied to the window of the subscriber (None for the raw window)
+        :param channels: numbers of the channels the subscriber needs (rows of the window), None for all of them
+        :return: No return
+        """
+        length = min(max(int(length), 1), self.ring.capacity)
+        self.subscribers[owner] = length
+        self.window_length = max(self.subscribers.values())
+        self.frames.setdefault(owner, 0)
+        self.projections[owner] = None if channels is None else sorted(set(channels))
+        self.update_projection()
+        # The channels of the subscriber are in the ring once it is tagged with the current version
+        self.required[owner] = self.version
+        worker = self.workers.get(owner)
+        if(processor is None):
+            if(worker is not None):
+                worker.stop()
+                del self.workers[owner]
+            return
+        if(worker is None):
+            worker = Feature_process(self.ring.name, self.ring.nb_channels, self.ring.capacity, processor, length)
+            worker.start()
+            self.workers[owner] = worker
+        else:
+            worker.length.value = length
+            if(processor is not worker.processor):
+                worker.set_processor(processor)
+                # The result of the previous processor must not be shown, the next one is computed by get_result
+                self.results.pop(owner, None)
+                self.frames[owner] = 0
+
+    def unsubscribe(self, owner):
+        """
+        Removes a subscriber and stops its process. The acquisition process is stopped and the ring freed when no
+        subscriber is left.
+        :param owner: the subscribed object
+        :return: No return
+        """
+        self.subscribers.pop(owner, None)
+        self.results.pop(owner, None)
+        self.frames.pop(owner, None)
+        self.projections.pop(owner, None)
+        self.required.pop(owner, None)
+        self.slices.pop(owner, None)
+        worker = self.workers.pop(owner, None)
+        if(worker is not None):
+            worker.stop()
+        if(len(self.subscribers) == 0):
+            self.stop()
+        else:
+            self.update_projection()
+
+    def update_projection(self):
+        """
+        Sends the union of the channels needed by the subscribers (None if one of them needs all) to the acquisition
+        process with a new version number if it changed
+        :return: No return
+        """
+        needed = list(self.projections.values())
+        projection = None if any(c is None for c in needed) else sorted(set().union(*needed))
+        if(projection != self.projection):
+            self.version = self.version + 1
+            self.acq_process.control.put((self.version, projection))
+            self.projection = projection
+
+    def stop(self):
+        """
+        Stops all the processes and frees the shared ring
+        :return: No return
+        """
+        for worker in self.workers.values():
+            worker.stop()
+        self.workers = {}
+        if(self.ring.data is not None):
+            if(self.acq_process.is_alive()):
+                self.acq_process.stop()
+            self.ring.close()
+
+    def close(self):
+        """
+        Same as stop, the stream is owned and closed by the acquisition process
+        :return: No return
+        """
+        self.stop()
+
+    def get_frame(self, owner):
+        """
+        Returns a counter that changes whenever a new result (or raw window) is available for the subscriber
+        :param owner: the subscribed object
+        :return: frame counter
+        """
+        worker = self.workers.get(owner)
+        if(worker is None):
+            if(self.ring.tag >= self.required.get(owner, 0)):
+                self.frames[owner] = self.ring.count
+            return self.frames[owner]
+        while True:
+            try:
+                generation, tag, result = worker.results.get_nowait()
+            except queue.Empty:
+                break
+            # Results of a replaced processor, or of samples of an older projection (they may lack the channels of
+            # the subscriber) are dropped
+            if(generation == worker.generation and tag >= self.required.get(owner, 0)):
+                self.results[owner] = result
+                self.frames[owner] = self.frames[owner] + 1
+        return self.frames[owner]
+
+    def get_slice(self, owner):
+        """
+        Returns a copy of the newest raw samples requested by the subscriber. While the ring holds samples of a
+        projection that does not contain the channels of the subscriber, the previous slice is returned (or, for the
+        first one, the function waits until the acquisition process has rewritten the ring).
+        :param owner: the subscribed object
+        :return: (channels x samples) array ordered from the oldest to the newest sample
+        """
+        window = self.read_covered(owner, owner not in self.slices)
+        if(window is not None):
+            self.slices[owner] = window
+        return self.slices[owner]
+
+    def read_covered(self, owner, wait, timeout = 2):
+        """
+        Reads the newest raw samples of a subscriber if the ring holds its channels
+        :param owner: the subscribed object
+        :param wait: if True the function waits until the ring holds the channels of the subscriber
+        :param timeout: maximum waiting time in s, the samples are then returned anyway
+        :return: (channels x samples) array, None if the ring does not hold the channels and wait is False
+        """
+        start = time.perf_counter()
+        while True:
+            window, tag = self.ring.read_latest(self.subscribers[owner], tag = True)
+            if(tag >= self.required.get(owner, 0)):
+                return window
+            if(not wait):
+                return None
+            if(time.perf_counter() - start > timeout or not self.acq_process.is_alive()):
+                return window
+            time.sleep(0.005)
+
+    def get_result(self, owner):
+        """
+        Returns the latest result computed by the process of the subscriber, or the raw window if it has no processor.
+        The first result of a new process is computed here, so that the plot always has something to draw.
+        :param owner: the subscribed object
+        :return: output of the processor of the subscriber
+        """
+        worker = self.workers.get(owner)
+        if(worker is None):
+            return self.get_slice(owner)
+        self.get_frame(owner)
+        if(owner not in self.results):
+            self.results[owner] = worker.processor(self.get_slice(owner))
+        return self.results[owner]
@@ -3,14 +3,15 @@ from PyQt5.QtWidgets import QApplication, QHBoxLayout, QWidget, QComboBox, QFile
 import numpy as np
 from DB_stream import DB_stream
 import pyqtgraph as pg
-import bioml.Feature_Extraction as FE
+from Acquisition_thread import Acquisition_thread
+from Feature_registry import registry
 import scipy.signal as sgn
 import pyqtgraph.ptime as ptime
 from LUI import Ui_Form
-from statistics import mean
+from Stage_timer import Stage_timer
+from Timing_overlay import Timing_overlay
 from collections import deque
-from scipy.fft import fft
-from scipy.fft import fftfreq
+from Spectrum_engine import Spectrum_engine
 
 
 
@@ -28,7 +29,7 @@ class RT_Fourier_Raw(QWidget):
 
     close_request = pyqtSignal(str)
 
-    def __init__(self, stream, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 10000):
+    def __init__(self, stream, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 10000, acquisition = None):
         """
         constuctor
         Initialises all the widgets and connects them to their corresponding functions/slots
@@ -40,6 +41,7 @@ class RT_Fourier_Raw(QWidget):
         :param min_len: min choosable window length
         :param max_len: max choosable windwo length
         :param kernel: convoltion kernel
+        :param acquisition: Acquisition_thread shared with other plots. If None the plot creates its own
         """
         print("preinitialisation beginning")
         super().__init__()
@@ -48,8 +50,19 @@ class RT_Fourier_Raw(QWidget):
         self.feature_name = feature_name
         self.fs = fs
         self.step = step
-        channels = list(self.stream.get_Window().columns)
-        self.channel = channels[1]
+        self.timing = Stage_timer("Fourier_Raw")
+        self.acq = acquisition if acquisition is not None else Acquisition_thread(stream)
+        self.win_len = self.acq.get_defaultLen()
+        self.channel_idx = 0
+        self.average = False
+        self.taper = 'hann'
+        # Only the displayed channel is fetched from the stream (all of them for the average spectrum), the spectrum
+        # is computed by the processor of the subscription
+        self.engine = None
+        self.set_engine()
+        self.frame = 0
+        channels = self.acq.get_channels()
+        self.channel = channels[0]
 
 
 
@@ -68,29 +81,42 @@ class RT_Fourier_Raw(QWidget):
 
 
         # Creating plots
-        self.Fourier1_plot = self.Fourier1_widget.getPlotItem().plot()
+        self.Fourier1_plot = self.Fourier1_widget.getPlotItem().plot(skipFiniteCheck = True)
+        # Long windows are reduced to the resolution of the screen (keeping the peaks) and only the visible part is
+        # drawn
+        self.Fourier1_widget.getPlotItem().setDownsampling(auto = True, mode = 'peak')
+        self.Fourier1_widget.getPlotItem().setClipToView(True)
 
 
 
         self.updateTime = ptime.time()
         self.fps = 0
-        tm = [self.step] * 100
-        self.intrvl = deque(tm)
 
 
         self.form = QWidget()
         self.ui_form = Ui_Form()
         self.ui_form.setupUi(self.form)
+        # The history length only applies to the feature lineplot
+        self.ui_form.label_5.hide()
+        self.ui_form.historyBox.hide()
+        self.ui_form.stackedBox.hide()
 
         ##Setting up ChannelBox
         self.ui_form.ChannelBox.setInsertPolicy(QComboBox.NoInsert)
-        for i in channels[1:]:
+        for i in channels:
             self.ui_form.ChannelBox.addItem(str(i))
+        # Last item: spectrum averaged over all the channels
+        self.ui_form.ChannelBox.addItem("Average")
+
+        ## Setting up the taper option
+        self.ui_form.taperBox.setInsertPolicy(QComboBox.NoInsert)
+        for i in ['hann', 'hamming', 'blackman', 'boxcar']:
+            self.ui_form.taperBox.addItem(i)
 
 
 
         # Setting up the FilterBox
-        self.all_feat = FE.DefinedFeatures()
+        self.all_feat = registry.get_definitions()
         self.ui_form.FilterBox.setInsertPolicy(QComboBox.NoInsert)
         tmp = self.all_feat.get_existing_features()
         for i in tmp:
@@ -99,7 +125,7 @@ class RT_Fourier_Raw(QWidget):
         ## Setting up the Window length option
         self.ui_form.window_sizeBox.setMinimum(min_len)
         self.ui_form.window_sizeBox.setMaximum(max_len)
-        self.ui_form.window_sizeBox.setValue(int(self.stream.get_winLen() * (1000/self.fs)))
+        self.ui_form.window_sizeBox.setValue(int(self.win_len * (1000/self.fs)))
 
         ## Setting up the step option
         self.ui_form.step_sizeBox.setMinimum(0)
@@ -115,18 +141,27 @@ class RT_Fourier_Raw(QWidget):
         self.ui_form.FilterBox.currentTextChanged.connect(self.update_filter)
         self.ui_form.window_sizeBox.valueChanged.connect(self.update_winLen)
         self.ui_form.step_sizeBox.valueChanged.connect(self.update_step)
+        self.ui_form.taperBox.currentTextChanged.connect(self.update_taper)
 
-        # Creating all the timers and connection them to their corresponding function
-        self.timer_thred = QTimer()
-        self.timer_thred.setTimerType(Qt.PreciseTimer)
-        self.timer_thred.setInterval(self.step)
-        self.timer_thred.start()
+        # Creating the timer and connecting it to its function
         self.timer = QTimer()
         self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.setInterval(self.step)
-        self.timer.timeout.connect(self.update_plt)
+        self.timer.timeout.connect(self.refresh)
         self.timer.start()
 
+        # Timings of the plot and of its acquisition, shown with F3 and exported with F4
+        self.overlay = Timing_overlay(self, [self.timing] + self.acq.get_timers())
+
+    def refresh(self):
+        """
+        Slot of the timer that redraws the plot only if the acquisition thread has published a new window since the
+        last redraw
+        :return: No return
+        """
+        if(self.acq.get_frame(self) != self.frame):
+            self.update_plt()
+
 
     def update_channel(self):
         """
@@ -134,7 +169,29 @@ class RT_Fourier_Raw(QWidget):
         :return: No return
         """
         self.channel = self.ui_form.ChannelBox.currentText()
-        self.update_plt()
+        self.average = self.ui_form.ChannelBox.currentIndex() == self.ui_form.ChannelBox.count() - 1
+        if(not self.average):
+            self.channel_idx = self.ui_form.ChannelBox.currentIndex()
+        # The new channel is drawn by refresh as soon as the acquisition has fetched it
+        self.set_engine()
+
+    def update_taper(self):
+        """
+        Slot that updates the taper window of the spectrum
+        :return: No return
+        """
+        self.taper = self.ui_form.taperBox.currentText()
+        self.set_engine()
+
+    def set_engine(self):
+        """
+        Creates the spectrum engine of the displayed channel (or of all the channels for the average spectrum) and
+        subscribes with it
+        :return: No return
+        """
+        rows = None if self.average else [self.channel_idx]
+        self.engine = Spectrum_engine(self.fs, self.taper, rows, self.average, timing = self.timing)
+        self.acq.subscribe(self, self.win_len, self.engine, channels = rows)
 
     def update_winLen(self):
         """
@@ -142,10 +199,11 @@ class RT_Fourier_Raw(QWidget):
         :return: No return
         """
         g = int(self.ui_form.window_sizeBox.value() * (self.fs/1000) + 1)
-        self.stream.set_winLen(g)
+        self.win_len = g
+        self.acq.subscribe(self, g, self.engine, channels = self.engine.rows)
         self.update_plt()
         print("Update window length")
-        print(self.stream.window_length)
+        print(self.win_len)
 
     def update_step(self):
         """
@@ -176,31 +234,35 @@ class RT_Fourier_Raw(QWidget):
         :return: No return
         """
         print("User has clicked the red x on the main window")
+        # The timers are stopped first, a refresh after unsubscribe would ask the acquisition for an unknown subscriber
+        self.timer.stop()
+        self.overlay.stop()
+        self.acq.unsubscribe(self)
         self.close_request.emit("desallocate_window")
         event.accept()
 
     def update_plt(self):
         """
-        Most central function of the class. It requests new data from the DB and then updates the image. In order for
-        the image to be constantly updated and therefore create a real-time video animation, a timer calls this function
-        at currently defined interval steps
+        Most central function of the class. It takes the latest window of the acquisition thread and then updates the
+        image. In order for the image to be constantly updated and therefore create a real-time video animation, a timer
+        calls this function (through refresh) at currently defined interval steps
         :return:
         """
-        window = self.stream.get_Window()
-        window = window.set_index('index')
-        kk = window[self.channel].to_numpy()
-        self.Fourier1_plot.setData(list(fftfreq(len(kk), 1 / self.fs)[:len(kk) // 2]),list(abs(fft(kk)[:len(kk) // 2])))
+        self.timing.start()
+        self.frame = self.acq.get_frame(self)
+        freqs, spectra = self.acq.get_result(self)
+        self.timing.mark("result")
+        self.Fourier1_plot.setData(freqs, spectra[0])
+        self.timing.mark("setData")
 
         #print("%0.1f fps" % self.fps)
         now = ptime.time()
 
 
         fps2 = 1.0 / (now - self.updateTime)
-        self.intrvl.append(now-self.updateTime)
-        self.intrvl.popleft()
-        print(mean(self.intrvl))
         self.updateTime = now
         self.fps = self.fps * 0.9 + fps2 * 0.1
+        self.timing.stop()
 
     def seq_notchFilter(self, vec):
         """This function could be used to filter out harmonic frequencies However it is still problematic. The problem
@@ -6,17 +6,21 @@ from colour import Color
 import numpy as np
 from DB_stream import DB_stream
 import pyqtgraph as pg
+from Acquisition_thread import Acquisition_thread
+from Heatmap_processor import Heatmap_processor
+from Grid_interpolator import Grid_interpolator
 from pgcolorbar.colorlegend import ColorLegendItem
-import bioml.Feature_Extraction as FE
+from Feature_registry import registry
 import scipy.signal as sgn
 import pyqtgraph.ptime as ptime
 from HUI import Ui_Form
 from collections import deque
-from statistics import mean
-import pyqtgraph.exporters
+from Stage_timer import Stage_timer
+from Timing_overlay import Timing_overlay
+from Recorder_thread import Recorder_thread
 import os
+import shutil
 import tempfile
-from distutils.dir_util import copy_tree
 
 
 
@@ -33,7 +37,7 @@ class RT_Heatmap(QWidget):
 
     close_request = pyqtSignal(str)
 
-    def __init__(self, stream, mtx_form, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 1000,  kernel = default_kernel):
+    def __init__(self, stream, mtx_form, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 1000,  kernel = default_kernel, acquisition = None, interpolation = 'kernel', upsample = 4, pushdown = False):
         """
         _constructor
         Initialises all the widgets and connects them to their corresponding functions/slots
@@ -45,16 +49,35 @@ class RT_Heatmap(QWidget):
         :param min_len: min selectable window length
         :param max_len: max selectable window length
         :param kernel: convoltion kernel
+        :param interpolation: default interpolation method of the image (see Grid_interpolator)
+        :param upsample: upsampling factor used by the distance based interpolation methods
+        :param pushdown: if True the feature is computed by the Database server when possible (MAV, RMS, VAR)
+        :param acquisition: Acquisition_thread shared with other plots. If None the plot creates its own
         """
         print("preinitialisation beginning")
         super().__init__()
         print("preinitialisation complete")
         self.stream = stream
         self.feature_name = feature_name
+        self.feature_names = [feature_name]
         self.fs = fs
         self.step = step
+        self.timing = Stage_timer("Heatmap")
         self.kernel = kernel
+        self.interpolation = interpolation
+        self.upsample = upsample
+        self.pushdown = pushdown
         self.mtx_form = mtx_form
+        self.processor = self.make_processor()
+        self.acq = acquisition if acquisition is not None else Acquisition_thread(stream)
+        self.win_len = self.acq.get_defaultLen()
+        self.acq.subscribe(self, self.win_len, self.processor)
+        self.frame = 0
+
+        # The recordings are written by a background thread to a temporary directory until they are saved
+        self.recorder = None
+        self.temp_dir = None
+        self.path = None
 
 
         # Creating all the widgets necessary for the GUI
@@ -71,6 +94,7 @@ class RT_Heatmap(QWidget):
         colors = blue.range_to(red, 256)
         colors_array = np.array([np.array(color.get_rgb()) * 255 for color in colors])
         look_up_table = colors_array.astype(np.uint8)
+        self.lut = look_up_table
 
         # Creating image
         self.img = pg.ImageItem(border='w')
@@ -80,8 +104,6 @@ class RT_Heatmap(QWidget):
 
         self.updateTime = ptime.time()
         self.fps = 0
-        tm = [self.step] * 100
-        self.intrvl = deque(tm)
 
         # Creating Colorbar
         self.img.setLookupTable(look_up_table)
@@ -96,16 +118,18 @@ class RT_Heatmap(QWidget):
         self.ui_form.setupUi(self.form)
 
         # Setting up the FilterBox
-        self.all_feat = FE.DefinedFeatures()
+        self.all_feat = registry.get_definitions()
         self.ui_form.FilterBox.setInsertPolicy(QComboBox.NoInsert)
         tmp = self.all_feat.get_existing_features()
         for i in tmp:
             self.ui_form.FilterBox.addItem(i.name)
+        ## Features shown next to the one of the FilterBox
+        self.ui_form.FeatureList.addItems(registry.names())
 
         ## Setting up the Window length option
         self.ui_form.window_sizeBox.setMinimum(min_len)
         self.ui_form.window_sizeBox.setMaximum(max_len)
-        self.ui_form.window_sizeBox.setValue(int(self.stream.get_winLen() * (1000/self.fs)))
+        self.ui_form.window_sizeBox.setValue(int(self.win_len * (1000/self.fs)))
 
         ## Setting up the step option
         self.ui_form.step_sizeBox.setMinimum(0)
@@ -121,6 +145,14 @@ class RT_Heatmap(QWidget):
         self.ui_form.ColorBox.setInsertPolicy(QComboBox.NoInsert)
         self.ui_form.ColorBox.addItems(["yellow", "white", "green", "blue", "red","orange","violet","snow","lightyellow"])
 
+        ## Setting up the Interpolation option
+        self.ui_form.InterpBox.setInsertPolicy(QComboBox.NoInsert)
+        self.ui_form.InterpBox.addItems(Grid_interpolator.methods)
+        self.ui_form.InterpBox.setCurrentText(self.interpolation)
+
+        ## Setting up the feature push-down option
+        self.ui_form.Pushdown_CheckBox.setChecked(self.pushdown)
+
 
 
         self.ui_form.sv_file.setEnabled(False)
@@ -131,52 +163,57 @@ class RT_Heatmap(QWidget):
         self.ui_form.StrtButton.clicked.connect(self.start_recording)
         self.ui_form.StpButton_2.clicked.connect(self.stop_recording)
         self.ui_form.FilterBox.currentTextChanged.connect(self.update_filter)
+        self.ui_form.FeatureList.itemSelectionChanged.connect(self.update_filter)
         self.ui_form.window_sizeBox.valueChanged.connect(self.update_winLen)
         self.ui_form.step_sizeBox.valueChanged.connect(self.update_step)
         self.ui_form.ColorBox.currentTextChanged.connect(self.update_color)
-        self.ui_form.StrtButton.clicked.connect(self.start_recording)
-        self.ui_form.StpButton_2.clicked.connect(self.stop_recording)
+        self.ui_form.InterpBox.currentTextChanged.connect(self.update_interp)
+        self.ui_form.Pushdown_CheckBox.toggled.connect(self.update_pushdown)
         self.ui_form.sv_file.clicked.connect(self.save_file)
         self.ui_form.CnclButton_3.clicked.connect(self.cancel_recording)
 
 
-        # Defining an exporter for the recorded images
-        self.exporter = pg.exporters.ImageExporter(self.view)
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.path = self.temp_dir.name
-        print(self.path)
-        self.cnt = 0
-
-        # Creating all the timers and connection them to their corresponding function
-        self.timer_thred = QTimer()
-        self.timer_thred.setTimerType(Qt.PreciseTimer)
-        self.timer_thred.setInterval(self.step)
-        self.timer_thred.start()
+        # Creating the timer and connecting it to its function
         self.timer = QTimer()
         self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.setInterval(self.step)
-        self.timer.timeout.connect(self.update_img)
+        self.timer.timeout.connect(self.refresh)
         self.timer.start()
 
+        # Timings of the plot and of its acquisition, shown with F3 and exported with F4
+        self.overlay = Timing_overlay(self, [self.timing] + self.acq.get_timers())
 
-    def thread_record(self):
+    def refresh(self):
         """
-        Exports the current image to the temporary file
+        Slot of the timer that redraws the plot only if the acquisition thread has published a new window since the
+        last redraw
         :return: No return
         """
-        self.exporter.export(self.path + "/img{}.jpg".format(self.cnt) ,False , False)
-        self.cnt = self.cnt + 1
-        #self.save_request.emit(self.exporter)
+        if(self.acq.get_frame(self) != self.frame):
+            self.update_img()
 
 
     def start_recording(self):
         """
-        Slot that starts the recording if button is pushed
+        Slot that starts the recording if button is pushed. Every drawn frame (picture, image matrix and feature
+        vector) is then handed to a Recorder_thread writing into a new temporary directory.
         :return: No return
         """
         self.ui_form.StrtButton.setEnabled(False)
         self.ui_form.StpButton_2.setEnabled(True)
-        self.timer_thred.timeout.connect(self.thread_record)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = self.temp_dir.name
+        print(self.path)
+        np.save(os.path.join(self.path, "layout.npy"), np.asarray(self.mtx_form))
+        info = {"fs": self.fs,
+                "feature": self.feature_name,
+                "features": list(self.feature_names),
+                "interpolation": self.interpolation,
+                "window_length": self.win_len,
+                "channels": list(self.acq.get_channels()),
+                "layout": np.asarray(self.mtx_form).tolist()}
+        self.recorder = Recorder_thread(self.path, info = info)
+        self.recorder.start()
 
 
     def stop_recording(self):
@@ -185,7 +222,10 @@ class RT_Heatmap(QWidget):
         :return: No return
         """
         self.ui_form.StpButton_2.setEnabled(False)
-        self.timer_thred.timeout.disconnect(self.thread_record)
+        if(self.recorder is not None):
+            self.recorder.stop()
+            print("Recorded {} frames".format(self.recorder.nb_frames))
+            self.recorder = None
         self.ui_form.sv_file.setEnabled(True)
 
 
@@ -197,8 +237,7 @@ class RT_Heatmap(QWidget):
         """
         name = QtGui.QFileDialog.getSaveFileName()
         if(name[0] != ''):
-            os.mkdir(name[0])
-            copy_tree(self.path, name[0])
+            shutil.copytree(self.path, name[0])
             print(name)
             print("Saving file")
             self.temp_dir.cleanup()
@@ -217,8 +256,12 @@ class RT_Heatmap(QWidget):
         dlg.setIcon(QMessageBox.Question)
         button = dlg.exec_()
         if button == QMessageBox.Yes:
-            self.temp_dir.cleanup()
+            if(self.recorder is not None):
+                self.stop_recording()
+            if(self.temp_dir is not None):
+                self.temp_dir.cleanup()
             self.ui_form.StrtButton.setEnabled(True)
+            self.ui_form.StpButton_2.setEnabled(False)
             self.ui_form.sv_file.setEnabled(False)
 
 
@@ -228,11 +271,12 @@ class RT_Heatmap(QWidget):
         :return: No return
         """
         g = int(self.ui_form.window_sizeBox.value() * (self.fs/1000) + 1)
-        self.stream.set_winLen(g)
+        self.win_len = g
+        self.acq.subscribe(self, g, self.processor)
         self.update_img()
         self.color_bar.autoScaleFromImage()
         print("Update window length")
-        print(self.stream.window_length)
+        print(self.win_len)
 
     def update_step(self):
         """
@@ -247,14 +291,53 @@ class RT_Heatmap(QWidget):
 
     def update_filter(self):
         """
-        Slot that updates the filter attribute if the corresponding widget text changes
+        Slot that updates the filter attribute if the corresponding widget text changes, or the features shown side by
+        side if the selection of the FeatureList changes. The feature pipeline is only rebuilt here.
         :return: No return
         """
         self.feature_name = self.ui_form.FilterBox.currentText()
+        items = [self.ui_form.FeatureList.item(i) for i in range(self.ui_form.FeatureList.count())]
+        extra = [i.text() for i in items if i.isSelected() and i.text() != self.feature_name]
+        self.feature_names = [self.feature_name] + extra
+        self.processor = self.make_processor()
+        self.acq.subscribe(self, self.win_len, self.processor)
         self.update_img()
         self.color_bar.autoScaleFromImage()
 
 
+    def update_interp(self):
+        """
+        Slot that updates the interpolation method if the corresponding widget text changes
+        :return: No return
+        """
+        self.interpolation = self.ui_form.InterpBox.currentText()
+        self.processor = self.make_processor()
+        self.acq.subscribe(self, self.win_len, self.processor)
+        self.update_img()
+        self.view.autoRange()
+        self.color_bar.autoScaleFromImage()
+
+    def update_pushdown(self):
+        """
+        Slot that switches between the feature computed by the Database server and the feature computed from the
+        fetched window
+        :return: No return
+        """
+        self.pushdown = self.ui_form.Pushdown_CheckBox.isChecked()
+        self.processor = self.make_processor()
+        self.acq.subscribe(self, self.win_len, self.processor)
+        self.update_img()
+        self.color_bar.autoScaleFromImage()
+
+    def make_processor(self):
+        """
+        Creates the processor computing the image with the current feature and interpolation method
+        :return: Heatmap_processor object
+        """
+        upsample = 1 if self.interpolation == 'kernel' else self.upsample
+        return Heatmap_processor(self.feature_names, self.fs, self.mtx_form, self.kernel, self.interpolation, upsample,
+                                 self.timing, self.pushdown)
+
     def update_color(self):
         """
         Slot that updates the color attribute if the corresponding widget text changes
@@ -264,26 +347,12 @@ class RT_Heatmap(QWidget):
         colors = c1.range_to(c2, 256)
         colors_array = np.array([np.array(color.get_rgb()) * 255 for color in colors])
         look_up_table = colors_array.astype(np.uint8)
+        self.lut = look_up_table
         self.img.setLookupTable(look_up_table)
         self.update_img()
         self.color_bar.setImageItem(self.img)
         print("Update color")
 
-    def get_imgMatrix(self,v):
-        """
-        Creates an image matrix with the values from a given array/list v and the channel/sensor configuration
-        :param v: array/list of channel/sensor values
-        :return: an image matrix where the channel values are set at the correct position in a matrix
-        """
-        r_mtx = np.zeros((len(self.mtx_form), len(self.mtx_form[0])))
-        for m in range(len(self.mtx_form)):
-            for n in range(len(self.mtx_form[0])):
-                if(self.mtx_form[m][n] != 0 and v !=[]):
-                    r_mtx[m][n] = v[int(self.mtx_form[m][n]) - 1]
-                else:
-                    r_mtx[m][n] = 0
-        return r_mtx
-
     def closeEvent(self, event):
         """
         Overwritten function that sends a signal if the window is to be closed (red x is clicked). This signal
@@ -292,36 +361,39 @@ class RT_Heatmap(QWidget):
         :return: No return
         """
         print("User has clicked the red x on the main window")
+        # The timers are stopped first, a refresh after unsubscribe would ask the acquisition for an unknown subscriber
+        self.timer.stop()
+        self.overlay.stop()
+        self.acq.unsubscribe(self)
+        if(self.recorder is not None):
+            self.recorder.stop()
         self.close_request.emit("desallocate_window")
         event.accept()
 
     def update_img(self):
         """
-        Most central function of the class. It requests new data from the DB and then updates the image. In order for
-        the image to be constantly updated and therefore create a real-time video animation, a timer calls this function
-        at currently defined interval steps
+        Most central function of the class. It takes the latest window of the acquisition thread and then updates the
+        image. In order for the image to be constantly updated and therefore create a real-time video animation, a timer
+        calls this function (through refresh) at currently defined interval steps
         :return:
         """
-        window = self.stream.get_Window()
-        #timestamp = window['index'].to_numpy()[0] / 100000
-        #dt_object = datetime.fromtimestamp(timestamp)
-        window = window.set_index('index')
-        y = FE.MFE(window.to_numpy().transpose(), [FE.DefinedFeatures().features[self.feature_name]], self.fs)
-        mtx = self.get_imgMatrix(y)
-        cnv = sgn.convolve2d(mtx, self.kernel, boundary='wrap', mode='same') / self.kernel.sum()
-        output = mtx.copy()
-        output[mtx == 0] = cnv[mtx == 0]
+        self.timing.start()
+        self.frame = self.acq.get_frame(self)
+        y, output = self.acq.get_result(self)
+        self.timing.mark("result")
         #print("%0.1f fps" % self.fps)
         self.img.setImage(np.rot90(output.T,1))
+        self.timing.mark("setImage")
+        if(self.recorder is not None):
+            self.recorder.add_frame(np.rot90(output.T,1), self.img.getLevels(), self.lut, output, y)
+            self.timing.mark("record")
 
 
         now = ptime.time()
         fps2 = 1.0 / (now - self.updateTime)
-        self.intrvl.append(now-self.updateTime)
-        self.intrvl.popleft()
-        print(mean(self.intrvl))
         self.updateTime = now
         self.fps = self.fps * 0.9 + fps2 * 0.1
+        self.timing.stop()
 
 
 
@@ -1,15 +1,19 @@
 from PyQt5.QtCore import QTimer, Qt, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QHBoxLayout, QWidget, QComboBox, QFileDialog,QMessageBox,QDialog
 import numpy as np
-import pandas as pd
 from DB_stream import DB_stream
 import pyqtgraph as pg
-import bioml.Feature_Extraction as FE
+from Acquisition_thread import Acquisition_thread
+from Feature_processor import Feature_processor
+from Feature_registry import registry
 import scipy.signal as sgn
 import pyqtgraph.ptime as ptime
 from LUI import Ui_Form
-from statistics import mean
-from collections import deque
+from Stage_timer import Stage_timer
+from Timing_overlay import Timing_overlay
+from Ring_buffer import Ring_buffer
+from Stacked_traces import Stacked_traces
+from Time_axis import Time_axis
 import distutils.core
 
 
@@ -21,7 +25,8 @@ class RT_Lineplot(QWidget):
 
     close_request = pyqtSignal(str)
 
-    def __init__(self, stream, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 10000):
+    def __init__(self, stream, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 10000, acquisition = None,
+                 history_len = 1500):
         """
         constuctor
         Initialises all the widgets and connects them to their corresponding functions/slots
@@ -33,6 +38,8 @@ class RT_Lineplot(QWidget):
         :param min_len: min choosable window length
         :param max_len: max choosable windwo length
         :param kernel: convoltion kernel
+        :param acquisition: Acquisition_thread shared with other plots. If None the plot creates its own
+        :param history_len: number of frames (feature values) kept and displayed
         """
         print("preinitialisation beginning")
         super().__init__()
@@ -41,16 +48,33 @@ class RT_Lineplot(QWidget):
         self.feature_name = feature_name
         self.fs = fs
         self.step = step
-        channels = list(self.stream.get_Window().columns)
-        self.channel = channels[1]
-        self.EMG = pd.DataFrame(np.zeros((1500,64)), columns= channels[1:])
-        self.Time = deque(np.zeros(1500))
+        self.timing = Stage_timer("Lineplot")
+        self.processor = Feature_processor(self.feature_name, self.fs, self.timing)
+        self.acq = acquisition if acquisition is not None else Acquisition_thread(stream)
+        self.win_len = self.acq.get_defaultLen()
+        self.acq.subscribe(self, self.win_len, self.processor)
+        self.frame = 0
+        channels = self.acq.get_channels()
+        self.channel = channels[0]
+        self.channel_idx = 0
+        self.stacked = False
+        self.nb_channels = len(channels)
+
+        # Circular history of the feature values of every channel and of their time stamps (relative to t0). A frame
+        # only writes one column: the curve is drawn with the time stamps themselves and the time axis shows them
+        # relative to the newest one (see Time_axis), so the x data is never rewritten and the curve is never moved
+        self.t0 = ptime.time()
+        self.history_len = history_len
+        self.history = None
+        self.times = None
+        self.set_history(history_len)
 
 
 
         l = QHBoxLayout()
 
-        self.Lineplot_widget = pg.PlotWidget(title = "EMG Lineplot")
+        self.time_axis = Time_axis(orientation = 'bottom')
+        self.Lineplot_widget = pg.PlotWidget(title = "EMG Lineplot", axisItems = {'bottom': self.time_axis})
         x1_axis = self.Lineplot_widget.getAxis('bottom')
         x1_axis.setLabel(text='Time [s]')
         y1_axis = self.Lineplot_widget.getAxis('left')
@@ -60,28 +84,38 @@ class RT_Lineplot(QWidget):
         l.addWidget(self.Lineplot_widget)
 
         # Creating plots
-        self.Lineplot = self.Lineplot_widget.getPlotItem().plot()
+        self.Lineplot = self.Lineplot_widget.getPlotItem().plot(skipFiniteCheck = True)
+        # Long windows are reduced to the resolution of the screen (keeping the peaks) and only the visible part is
+        # drawn. Both need sorted x data in view coordinates (the curve is never moved with setPos)
+        self.Lineplot.setDownsampling(auto = True, method = 'peak')
+        self.Lineplot.setClipToView(True)
+
+        # Curve of the stacked channels, one path for all of them. Its x values are not sorted, so it is neither
+        # downsampled nor clipped by pyqtgraph
+        self.Stacked_plot = self.Lineplot_widget.getPlotItem().plot(skipFiniteCheck = True)
+        self.stack = Stacked_traces()
 
 
         self.updateTime = ptime.time()
         self.fps = 0
-        tm = [self.step] * 100
-        self.intrvl = deque(tm)
 
 
         self.form = QWidget()
         self.ui_form = Ui_Form()
         self.ui_form.setupUi(self.form)
+        # The taper only applies to the Fourier plot
+        self.ui_form.label_6.hide()
+        self.ui_form.taperBox.hide()
 
         ##Setting up ChannelBox
         self.ui_form.ChannelBox.setInsertPolicy(QComboBox.NoInsert)
-        for i in channels[1:]:
+        for i in channels:
             self.ui_form.ChannelBox.addItem(str(i))
 
 
 
         # Setting up the FilterBox
-        self.all_feat = FE.DefinedFeatures()
+        self.all_feat = registry.get_definitions()
         self.ui_form.FilterBox.setInsertPolicy(QComboBox.NoInsert)
         tmp = self.all_feat.get_existing_features()
         for i in tmp:
@@ -90,13 +124,18 @@ class RT_Lineplot(QWidget):
         ## Setting up the Window length option
         self.ui_form.window_sizeBox.setMinimum(min_len)
         self.ui_form.window_sizeBox.setMaximum(max_len)
-        self.ui_form.window_sizeBox.setValue(int(self.stream.get_winLen() * (1000/self.fs)))
+        self.ui_form.window_sizeBox.setValue(int(self.win_len * (1000/self.fs)))
 
         ## Setting up the step option
         self.ui_form.step_sizeBox.setMinimum(0)
         self.ui_form.step_sizeBox.setMaximum(max_len)
         self.ui_form.step_sizeBox.setValue(self.step)
 
+        ## Setting up the history length option
+        self.ui_form.historyBox.setMinimum(2)
+        self.ui_form.historyBox.setMaximum(100000)
+        self.ui_form.historyBox.setValue(self.history_len)
+
         ## Setting up the Window length option
         l.addWidget(self.form)
         self.form.show()
@@ -106,18 +145,28 @@ class RT_Lineplot(QWidget):
         self.ui_form.FilterBox.currentTextChanged.connect(self.update_filter)
         self.ui_form.window_sizeBox.valueChanged.connect(self.update_winLen)
         self.ui_form.step_sizeBox.valueChanged.connect(self.update_step)
+        self.ui_form.stackedBox.toggled.connect(self.update_stacked)
+        self.ui_form.historyBox.valueChanged.connect(self.update_history)
 
-        # Creating all the timers and connection them to their corresponding function
-        self.timer_thred = QTimer()
-        self.timer_thred.setTimerType(Qt.PreciseTimer)
-        self.timer_thred.setInterval(self.step)
-        self.timer_thred.start()
+        # Creating the timer and connecting it to its function
         self.timer = QTimer()
         self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.setInterval(self.step)
-        self.timer.timeout.connect(self.update_plt)
+        self.timer.timeout.connect(self.refresh)
         self.timer.start()
 
+        # Timings of the plot and of its acquisition, shown with F3 and exported with F4
+        self.overlay = Timing_overlay(self, [self.timing] + self.acq.get_timers())
+
+    def refresh(self):
+        """
+        Slot of the timer that redraws the plot only if the acquisition thread has published a new window since the
+        last redraw
+        :return: No return
+        """
+        if(self.acq.get_frame(self) != self.frame):
+            self.update_plt()
+
 
     def update_channel(self):
         """
@@ -125,6 +174,25 @@ class RT_Lineplot(QWidget):
         :return: No return
         """
         self.channel = self.ui_form.ChannelBox.currentText()
+        self.channel_idx = self.ui_form.ChannelBox.currentIndex()
+        self.update_plt()
+
+    def update_stacked(self):
+        """
+        Slot that switches between the selected channel and the stacked traces of all the channels
+        :return: No return
+        """
+        self.stacked = self.ui_form.stackedBox.isChecked()
+        self.ui_form.ChannelBox.setEnabled(not self.stacked)
+        y1_axis = self.Lineplot_widget.getAxis('left')
+        if(self.stacked):
+            y1_axis.setLabel(text='Channel')
+            y1_axis.setTicks(Stacked_traces.ticks(self.nb_channels))
+            self.Lineplot.clear()
+        else:
+            y1_axis.setLabel(text='Voltage [mV]')
+            y1_axis.setTicks(None)
+            self.Stacked_plot.clear()
         self.update_plt()
 
     def update_winLen(self):
@@ -133,10 +201,11 @@ class RT_Lineplot(QWidget):
         :return: No return
         """
         g = int(self.ui_form.window_sizeBox.value() * (self.fs/1000) + 1)
-        self.stream.set_winLen(g)
+        self.win_len = g
+        self.acq.subscribe(self, g, self.processor)
         self.update_plt()
         print("Update window length")
-        print(self.stream.window_length)
+        print(self.win_len)
 
     def update_step(self):
         """
@@ -154,10 +223,32 @@ class RT_Lineplot(QWidget):
         :return: No return
         """
         self.feature_name = self.ui_form.FilterBox.currentText()
+        self.processor = Feature_processor(self.feature_name, self.fs, self.timing)
+        self.acq.subscribe(self, self.win_len, self.processor)
         self.update_plt()
 
+    def update_history(self):
+        """
+        Slot that updates the history length if the corresponding widget value changes
+        :return: No return
+        """
+        self.set_history(self.ui_form.historyBox.value())
+        print("Update history length")
 
-
+    def set_history(self, length):
+        """
+        Creates the history buffers with the given length. The newest values of the previous buffers are kept.
+        :param length: number of frames kept
+        :return: No return
+        """
+        history = Ring_buffer(self.nb_channels, length, dtype = np.float64)
+        times = Ring_buffer(1, length, dtype = np.float64)
+        if(self.history is not None):
+            history.write(self.history.latest(length))
+            times.write(self.times.latest(length))
+        self.history_len = length
+        self.history = history
+        self.times = times
 
 
     def closeEvent(self, event):
@@ -168,40 +259,48 @@ class RT_Lineplot(QWidget):
         :return: No return
         """
         print("User has clicked the red x on the main window")
+        # The timers are stopped first, a refresh after unsubscribe would ask the acquisition for an unknown subscriber
+        self.timer.stop()
+        self.overlay.stop()
+        self.acq.unsubscribe(self)
         self.close_request.emit("desallocate_window")
         event.accept()
 
     def update_plt(self):
         """
-        Most central function of the class. It requests new data from the DB and then updates the image. In order for
-        the image to be constantly updated and therefore create a real-time video animation, a timer calls this function
-        at currently defined interval steps
+        Most central function of the class. It takes the latest window of the acquisition thread and then updates the
+        image. In order for the image to be constantly updated and therefore create a real-time video animation, a timer
+        calls this function (through refresh) at currently defined interval steps
         :return:
         """
-        window = self.stream.get_Window()
-        window = window.set_index('index')
-        y = FE.MFE(window.to_numpy().transpose(), [FE.DefinedFeatures().features[self.feature_name]], self.fs)
+        self.timing.start()
+        self.frame = self.acq.get_frame(self)
+        y = self.acq.get_result(self)
+        self.timing.mark("result")
 
         #print("%0.1f fps" % self.fps)
         now = ptime.time()
-        self.EMG.iloc[1:] = self.EMG.iloc[:-1]
-        self.EMG.iloc[0] = y
-        tau = now-self.updateTime
-        self.Time.appendleft(tau)
-        self.Time = deque(np.array(self.Time)-tau)
-        self.Time.pop()
-
-        self.Lineplot.setData(list(self.Time), list(self.EMG[self.channel]))
+        self.history.write(np.reshape(y, (-1, 1))[:self.nb_channels])
+        self.times.write(np.array([[now - self.t0]]))
+
+        self.timing.mark("history")
+        # Views on the buffers, the axis shows the newest value at 0 s and the older ones at negative times
+        x = self.times.latest(self.history_len)[0]
+        if(self.stacked):
+            x, y = self.stack(x, self.history.latest(self.history_len))
+            self.Stacked_plot.setData(x, y, connect = 'finite')
+        else:
+            self.Lineplot.setData(x, self.history.latest(self.history_len)[self.channel_idx])
+        self.time_axis.set_origin(now - self.t0)
+        self.timing.mark("setData")
         #self.Lineplot.setData(list(np.linspace(0,len(self.EMG[self.channel])-1, len(self.EMG[self.channel]))), list(self.EMG[self.channel]))
         #self.Fourier1_plot.setData(list(fftfreq(len(kk),1/2400)[:len(kk)//2]), list(abs(fft(kk)[:len(kk)//2])))
         #self.Fourier1_plot.setData(list(fftfreq(len(self.EMG), 1 / 2400)[:len(self.EMG) // 2]), list(abs(fft(self.EMG)[:len(self.EMG) // 2])))
 
         fps2 = 1.0 / (now - self.updateTime)
-        self.intrvl.append(now-self.updateTime)
-        self.intrvl.popleft()
-        print(mean(self.intrvl))
         self.updateTime = now
         self.fps = self.fps * 0.9 + fps2 * 0.1
+        self.timing.stop()
 
     def seq_notchFilter(self, vec):
         """This function could be used to filter out harmonic frequencies However it is still problematic. The problem
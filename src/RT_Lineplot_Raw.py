@@ -3,11 +3,15 @@ from PyQt5.QtWidgets import QApplication, QHBoxLayout, QWidget, QComboBox, QFile
 import numpy as np
 from DB_stream import DB_stream
 import pyqtgraph as pg
-import bioml.Feature_Extraction as FE
+from Acquisition_thread import Acquisition_thread
+from Minmax_decimator import Minmax_decimator
+from Stacked_traces import Stacked_traces
+from Feature_registry import registry
 import scipy.signal as sgn
 import pyqtgraph.ptime as ptime
 from LUI import Ui_Form
-from statistics import mean
+from Stage_timer import Stage_timer
+from Timing_overlay import Timing_overlay
 from collections import deque
 
 
@@ -20,7 +24,7 @@ class RT_Lineplot_Raw(QWidget):
 
     close_request = pyqtSignal(str)
 
-    def __init__(self, stream, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 10000):
+    def __init__(self, stream, feature_name = 'MAV', fs = 2400, step = 0, min_len = 1, max_len = 10000, acquisition = None):
         """
         constuctor
         Initialises all the widgets and connects them to their corresponding functions/slots
@@ -32,6 +36,7 @@ class RT_Lineplot_Raw(QWidget):
         :param min_len: min choosable window length
         :param max_len: max choosable windwo length
         :param kernel: convoltion kernel
+        :param acquisition: Acquisition_thread shared with other plots. If None the plot creates its own
         """
         print("preinitialisation beginning")
         super().__init__()
@@ -40,8 +45,18 @@ class RT_Lineplot_Raw(QWidget):
         self.feature_name = feature_name
         self.fs = fs
         self.step = step
-        channels = list(self.stream.get_Window().columns)
-        self.channel = channels[1]
+        self.timing = Stage_timer("Lineplot_Raw")
+        self.acq = acquisition if acquisition is not None else Acquisition_thread(stream)
+        self.win_len = self.acq.get_defaultLen()
+        self.channel_idx = 0
+        self.stacked = False
+        # Only the displayed channel is fetched from the stream. Its window is decimated to the width of the plot
+        # (the number of buckets is updated once the plot is shown)
+        self.decimator = Minmax_decimator(1024, self.get_rows(), self.timing)
+        self.acq.subscribe(self, self.win_len, self.decimator, channels = self.get_rows())
+        self.frame = 0
+        channels = self.acq.get_channels()
+        self.channel = channels[0]
 
 
         l = QHBoxLayout()
@@ -57,29 +72,46 @@ class RT_Lineplot_Raw(QWidget):
 
 
         # Creating plots
-        self.Lineplot = self.Lineplot_widget.getPlotItem().plot()
+        self.Lineplot = self.Lineplot_widget.getPlotItem().plot(skipFiniteCheck = True)
+        # Long windows are reduced to the resolution of the screen (keeping the peaks) and only the visible part is
+        # drawn. Both need sorted x data in view coordinates (the curve is never moved with setPos)
+        self.Lineplot.setDownsampling(auto = True, method = 'peak')
+        self.Lineplot.setClipToView(True)
+
+        # Curve of the stacked channels, one path for all of them. Its x values are not sorted, so it is neither
+        # downsampled nor clipped by pyqtgraph (the windows are already decimated)
+        self.Stacked_plot = self.Lineplot_widget.getPlotItem().plot(skipFiniteCheck = True)
+        self.stack = Stacked_traces()
+
+        # Time axis of the window, only recomputed when the window length or the sampling frequency changes
+        self.x_axis = None
+        self.x_key = None
 
 
 
         self.updateTime = ptime.time()
         self.fps = 0
-        tm = [self.step] * 100
-        self.intrvl = deque(tm)
 
 
         self.form = QWidget()
         self.ui_form = Ui_Form()
         self.ui_form.setupUi(self.form)
+        # The history length only applies to the feature lineplot
+        self.ui_form.label_5.hide()
+        self.ui_form.historyBox.hide()
+        # The taper only applies to the Fourier plot
+        self.ui_form.label_6.hide()
+        self.ui_form.taperBox.hide()
 
         ##Setting up ChannelBox
         self.ui_form.ChannelBox.setInsertPolicy(QComboBox.NoInsert)
-        for i in channels[1:]:
+        for i in channels:
             self.ui_form.ChannelBox.addItem(str(i))
 
 
 
         # Setting up the FilterBox
-        self.all_feat = FE.DefinedFeatures()
+        self.all_feat = registry.get_definitions()
         self.ui_form.FilterBox.setInsertPolicy(QComboBox.NoInsert)
         tmp = self.all_feat.get_existing_features()
         for i in tmp:
@@ -88,7 +120,7 @@ class RT_Lineplot_Raw(QWidget):
         ## Setting up the Window length option
         self.ui_form.window_sizeBox.setMinimum(min_len)
         self.ui_form.window_sizeBox.setMaximum(max_len)
-        self.ui_form.window_sizeBox.setValue(int(self.stream.get_winLen() * (1000/self.fs)))
+        self.ui_form.window_sizeBox.setValue(int(self.win_len * (1000/self.fs)))
 
         ## Setting up the step option
         self.ui_form.step_sizeBox.setMinimum(0)
@@ -104,18 +136,27 @@ class RT_Lineplot_Raw(QWidget):
         self.ui_form.FilterBox.currentTextChanged.connect(self.update_filter)
         self.ui_form.window_sizeBox.valueChanged.connect(self.update_winLen)
         self.ui_form.step_sizeBox.valueChanged.connect(self.update_step)
+        self.ui_form.stackedBox.toggled.connect(self.update_stacked)
 
-        # Creating all the timers and connection them to their corresponding function
-        self.timer_thred = QTimer()
-        self.timer_thred.setTimerType(Qt.PreciseTimer)
-        self.timer_thred.setInterval(self.step)
-        self.timer_thred.start()
+        # Creating the timer and connecting it to its function
         self.timer = QTimer()
         self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.setInterval(self.step)
-        self.timer.timeout.connect(self.update_plt)
+        self.timer.timeout.connect(self.refresh)
         self.timer.start()
 
+        # Timings of the plot and of its acquisition, shown with F3 and exported with F4
+        self.overlay = Timing_overlay(self, [self.timing] + self.acq.get_timers())
+
+    def refresh(self):
+        """
+        Slot of the timer that redraws the plot only if the acquisition thread has published a new window since the
+        last redraw
+        :return: No return
+        """
+        if(self.acq.get_frame(self) != self.frame):
+            self.update_plt()
+
 
     def update_channel(self):
         """
@@ -123,7 +164,9 @@ class RT_Lineplot_Raw(QWidget):
         :return: No return
         """
         self.channel = self.ui_form.ChannelBox.currentText()
-        self.update_plt()
+        self.channel_idx = self.ui_form.ChannelBox.currentIndex()
+        # The new channel is drawn by refresh as soon as the acquisition has fetched it
+        self.set_decimator(self.decimator.nb_buckets)
 
     def update_winLen(self):
         """
@@ -131,10 +174,11 @@ class RT_Lineplot_Raw(QWidget):
         :return: No return
         """
         g = int(self.ui_form.window_sizeBox.value() * (self.fs/1000) + 1)
-        self.stream.set_winLen(g)
+        self.win_len = g
+        self.acq.subscribe(self, g, self.decimator, channels = self.get_rows())
         self.update_plt()
         print("Update window length")
-        print(self.stream.window_length)
+        print(self.win_len)
 
     def update_step(self):
         """
@@ -158,6 +202,59 @@ class RT_Lineplot_Raw(QWidget):
 
 
 
+    def update_stacked(self):
+        """
+        Slot that switches between the selected channel and the stacked traces of all the channels
+        :return: No return
+        """
+        self.stacked = self.ui_form.stackedBox.isChecked()
+        self.ui_form.ChannelBox.setEnabled(not self.stacked)
+        y1_axis = self.Lineplot_widget.getAxis('left')
+        if(self.stacked):
+            y1_axis.setLabel(text='Channel')
+            y1_axis.setTicks(Stacked_traces.ticks(self.ui_form.ChannelBox.count()))
+            self.Lineplot.clear()
+        else:
+            y1_axis.setLabel(text='Voltage [mV]')
+            y1_axis.setTicks(None)
+            self.Stacked_plot.clear()
+        self.set_decimator(self.decimator.nb_buckets)
+
+    def get_rows(self):
+        """
+        :return: channels fetched and drawn by the plot, None for all of them (stacked traces)
+        """
+        return None if self.stacked else [self.channel_idx]
+
+    def get_nbBuckets(self):
+        """
+        Returns the number of buckets of the decimation: the width of the plot in pixels rounded up to a multiple of
+        256, so that the decimator is not replaced continuously while the window is resized
+        :return: number of buckets
+        """
+        width = self.Lineplot_widget.getPlotItem().getViewBox().width()
+        return 256 * (int(width) // 256 + 1)
+
+    def set_decimator(self, nb_buckets):
+        """
+        Replaces the decimator of the displayed channels and subscribes with it
+        :param nb_buckets: number of buckets of the decimation
+        :return: No return
+        """
+        self.decimator = Minmax_decimator(nb_buckets, self.get_rows(), self.timing)
+        self.acq.subscribe(self, self.win_len, self.decimator, channels = self.get_rows())
+
+    def get_xAxis(self, n):
+        """
+        Returns the time axis of a window, recomputed only if the number of samples or the sampling frequency changed
+        :param n: number of samples of the window
+        :return: array of the times of the samples in s
+        """
+        if(self.x_key != (n, self.fs)):
+            self.x_axis = np.arange(n) / self.fs
+            self.x_key = (n, self.fs)
+        return self.x_axis
+
     def closeEvent(self, event):
         """
         Overwritten function that sends a signal if the window is to be closed (red x is clicked). This signal
@@ -166,32 +263,45 @@ class RT_Lineplot_Raw(QWidget):
         :return: No return
         """
         print("User has clicked the red x on the main window")
+        # The timers are stopped first, a refresh after unsubscribe would ask the acquisition for an unknown subscriber
+        self.timer.stop()
+        self.overlay.stop()
+        self.acq.unsubscribe(self)
         self.close_request.emit("desallocate_window")
         event.accept()
 
     def update_plt(self):
         """
-        Most central function of the class. It requests new data from the DB and then updates the image. In order for
-        the image to be constantly updated and therefore create a real-time video animation, a timer calls this function
-        at currently defined interval steps
+        Most central function of the class. It takes the latest window of the acquisition thread and then updates the
+        image. In order for the image to be constantly updated and therefore create a real-time video animation, a timer
+        calls this function (through refresh) at currently defined interval steps
         :return:
         """
-        window = self.stream.get_Window()
-        window = window.set_index('index')
+        self.timing.start()
+        self.frame = self.acq.get_frame(self)
+        if(self.get_nbBuckets() != self.decimator.nb_buckets):
+            self.set_decimator(self.get_nbBuckets())
+        x, y = self.acq.get_result(self)
+        self.timing.mark("result")
+        # Without decimation (short window) the samples are drawn on the cached time axis
+        x = self.get_xAxis(y.shape[1]) if x is None else x / self.fs
 
 
         #print("%0.1f fps" % self.fps)
         now = ptime.time()
 
 
-        self.Lineplot.setData(list(np.linspace(0,(len(window[self.channel]))*(1/self.fs), len(window[self.channel]))), list(window[self.channel]))
+        if(self.stacked):
+            x, y = self.stack(x, y)
+            self.Stacked_plot.setData(x, y, connect = 'finite')
+        else:
+            self.Lineplot.setData(x, y[0])
+        self.timing.mark("setData")
 
         fps2 = 1.0 / (now - self.updateTime)
-        self.intrvl.append(now-self.updateTime)
-        self.intrvl.popleft()
-        print(mean(self.intrvl))
         self.updateTime = now
         self.fps = self.fps * 0.9 + fps2 * 0.1
+        self.timing.stop()
 
     def seq_notchFilter(self, vec):
         """This function could be used to filter out harmonic frequencies However it is still problematic. The problem
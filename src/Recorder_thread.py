@@ -0,0 +1,221 @@
+from PyQt5.QtCore import QThread
+import numpy as np
+import queue
+import json
+import time
+import os
+
+try:
+    import imageio
+except ImportError:
+    imageio = None
+
+
+class Recorder_thread(QThread):
+    """
+    Recorder_thread class:
+    Background writer for the heatmap recordings. The GUI thread only puts the data of every frame in a queue, the
+    colouring and the encoding are done in this thread. The frames are written to a video (heatmap.mp4) if imageio and
+    its ffmpeg backend are installed, otherwise they are appended to a raw file (frames). The format is chosen once,
+    when the thread starts, so a recording never switches from one to the other.
+    Besides the pictures the underlying data is recorded too: the image matrix (grid), the feature vector (features)
+    and the time stamp (time) of every frame. Every array is appended frame by frame to raw binary chunk files
+    (a new chunk is started if the shape of the array changes) described in session.json, so that a recording can be
+    memory-mapped again with load_session. session.json is written when the recording starts and rewritten whenever a
+    chunk is started, so a recording interrupted by a crash can still be loaded (load_session takes the number of
+    frames of every chunk from the size of its file).
+    """
+    def __init__(self, path, fps = 25, scale = 8, max_queue = 1000, info = None):
+        """
+        _constructor
+        :param path: directory in which the recording is written
+        :param fps: frame rate stored in the video
+        :param scale: integer upscaling factor of the image (one image cell becomes scale x scale pixels)
+        :param max_queue: maximum number of frames waiting to be written. Frames are dropped if the queue is full
+        :param info: dictonary of additional information saved to session.json (sampling frequency, feature...)
+        """
+        super().__init__()
+        self.path = path
+        self.fps = fps
+        self.scale = scale
+        self.info = info if info is not None else {}
+        self.queue = queue.Queue(maxsize = max_queue)
+        self.nb_frames = 0
+        self.dropped = 0
+        self.frame_shape = None
+        self.video = None
+        self.arrays = {}
+        self.files = {}
+
+    def add_frame(self, output, levels, lut, grid = None, y = None, timestamp = None):
+        """
+        Queues a frame for writing. Called from the GUI thread.
+        :param output: image matrix as given to the ImageItem
+        :param levels: (min, max) levels of the image
+        :param lut: look up table (256 x 3 uint8)
+        :param grid: image matrix as computed by the processor (recorded as data)
+        :param y: feature vector of the frame
+        :param timestamp: time of the frame in s since the epoch (default now)
+        :return: No return
+        """
+        if(timestamp is None):
+            timestamp = time.time()
+        try:
+            self.queue.put_nowait((np.array(output, copy = True), levels, lut, grid, y, timestamp))
+        except queue.Full:
+            self.dropped = self.dropped + 1
+
+    def run(self):
+        """
+        Overwritten function of QThread. Writes the queued frames until None is received
+        :return: No return
+        """
+        self.open_video()
+        self.write_session(False)
+        while True:
+            item = self.queue.get()
+            if(item is None):
+                break
+            try:
+                self.write_frame(*item)
+            except Exception as e:
+                print("Recording error: {}".format(e))
+        self.close_files()
+
+    def open_video(self):
+        """
+        Creates the video writer. If imageio or its ffmpeg backend is not available the frames of the whole recording
+        are written to the raw frames file instead.
+        :return: No return
+        """
+        if(imageio is None):
+            return
+        try:
+            self.video = imageio.get_writer(os.path.join(self.path, "heatmap.mp4"), fps = self.fps)
+        except Exception as e:
+            print("No video writer, the frames are recorded as raw data: {}".format(e))
+            self.video = None
+
+    def render(self, output, levels, lut):
+        """
+        Colours an image matrix with the look up table like the ImageItem of the heatmap does
+        :param output: image matrix
+        :param levels: (min, max) levels of the image
+        :param lut: look up table (256 x 3 uint8)
+        :return: (rows x cols x 3) uint8 frame
+        """
+        lo, hi = levels
+        scale = (len(lut) - 1) / (hi - lo) if hi > lo else 0
+        idx = np.clip((output - lo) * scale, 0, len(lut) - 1).astype(np.intp)
+        frame = lut[np.flipud(idx)]
+        if(self.scale > 1):
+            frame = np.repeat(np.repeat(frame, self.scale, axis = 0), self.scale, axis = 1)
+        return frame
+
+    def write_frame(self, output, levels, lut, grid, y, timestamp):
+        """
+        Renders and writes one frame and appends its data
+        :return: No return
+        """
+        frame = self.render(output, levels, lut)
+        if(self.frame_shape is None):
+            self.frame_shape = frame.shape
+        if(self.video is not None):
+            if(frame.shape != self.frame_shape):
+                # The image size changed (other interpolation), the frame is padded/cropped to the first size
+                fixed = np.zeros(self.frame_shape, dtype = np.uint8)
+                r, c = min(frame.shape[0], fixed.shape[0]), min(frame.shape[1], fixed.shape[1])
+                fixed[:r, :c] = frame[:r, :c]
+                frame = fixed
+            self.video.append_data(frame)
+        else:
+            self.append("frames", frame, np.uint8)
+
+        self.append("time", np.array(timestamp), np.float64)
+        if(grid is not None):
+            self.append("grid", grid, np.float32)
+        if(y is not None):
+            self.append("features", y, np.float32)
+        self.nb_frames = self.nb_frames + 1
+
+    def append(self, name, value, dtype):
+        """
+        Appends the value of one frame to the chunk files of an array. A new chunk is started if the shape differs from
+        the shape of the current chunk.
+        :param name: name of the array
+        :param value: value of the frame
+        :param dtype: data type in which the value is stored
+        :return: No return
+        """
+        value = np.array(value, dtype = dtype, order = 'C')
+        chunks = self.arrays.setdefault(name, {"dtype": np.dtype(dtype).str, "chunks": []})["chunks"]
+        if(len(chunks) == 0 or tuple(chunks[-1]["shape"]) != value.shape):
+            if(name in self.files):
+                self.files[name].close()
+            file = "{}_{}.bin".format(name, len(chunks))
+            chunks.append({"file": file, "shape": list(value.shape), "start": self.nb_frames, "nb_frames": 0})
+            self.files[name] = open(os.path.join(self.path, file), 'wb')
+            self.write_session(False)
+        self.files[name].write(value.tobytes())
+        chunks[-1]["nb_frames"] += 1
+
+    def close_files(self):
+        """
+        Closes the output files and writes the final description of the recording to session.json
+        :return: No return
+        """
+        if(self.video is not None):
+            self.video.close()
+        for f in self.files.values():
+            f.close()
+        self.write_session(True)
+
+    def write_session(self, complete):
+        """
+        Writes the description of the recording to session.json. The file is replaced at once so that it is never
+        left half written.
+        :param complete: False while the recording is running, True once all the files are closed
+        :return: No return
+        """
+        info = dict(self.info)
+        info.update({"nb_frames": self.nb_frames,
+                     "dropped_frames": self.dropped,
+                     "fps": self.fps,
+                     "video": "heatmap.mp4" if self.video is not None else None,
+                     "complete": complete,
+                     "arrays": self.arrays})
+        tmp = os.path.join(self.path, "session.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(info, f, indent = 1)
+        os.replace(tmp, os.path.join(self.path, "session.json"))
+
+    @staticmethod
+    def load_session(path):
+        """
+        Loads a recording written by a Recorder_thread. The arrays are memory-mapped and not read into memory. The number
+        of frames of every chunk is taken from the size of its file (session.json of an interrupted recording does not
+        have the final counts), an incomplete last frame is ignored.
+        :param path: directory of the recording
+        :return: tuple (info dictonary of session.json, dictonary name -> list of (first frame, memmap) per chunk)
+        """
+        with open(os.path.join(path, "session.json"), 'r') as f:
+            info = json.load(f)
+        arrays = {}
+        for name, desc in info["arrays"].items():
+            arrays[name] = []
+            for c in desc["chunks"]:
+                file = os.path.join(path, c["file"])
+                frame_size = np.dtype(desc["dtype"]).itemsize * int(np.prod(c["shape"]))
+                nb_frames = os.path.getsize(file) // frame_size if os.path.exists(file) and frame_size > 0 else 0
+                if(nb_frames > 0):
+                    arrays[name].append((c["start"], np.memmap(file, dtype = desc["dtype"], mode = 'r',
+                                                               shape = (nb_frames,) + tuple(c["shape"]))))
+        return info, arrays
+
+    def stop(self):
+        """
+        Writes the remaining frames, closes the files and waits for the thread to finish
+        :return: No return
+        """
+        self.queue.put(None)
+        self.wait()
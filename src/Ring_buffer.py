@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class Ring_buffer(object):
+    """
+    Ring_buffer class:
+    Fixed capacity (channels x samples) buffer in which a stream writes its samples and from which the plots read.
+    Every sample is written twice (at its slot and one capacity further) so that the latest n samples can always be
+    returned as a view on one contiguous block of memory, without copying and without rebuilding any index. The rows of
+    the returned view are contiguous and ordered from the oldest to the newest sample.
+    """
+    def __init__(self, nb_channels, capacity, dtype = np.float32):
+        """
+        _constructor
+        Preallocates the memory of the buffer
+        :param nb_channels: number of channels (rows)
+        :param capacity: maximum number of samples that can be held per channel
+        :param dtype: data type of the samples
+        """
+        self.nb_channels = nb_channels
+        self.capacity = max(int(capacity), 1)
+        self.data = np.zeros((nb_channels, 2 * self.capacity), dtype = dtype)
+        self.pos = 0
+        self.count = 0
+
+    def write(self, block, rows = None):
+        """
+        Appends a block of samples to the buffer. If the block is longer than the capacity only its newest samples are
+        kept.
+        :param block: (channels x n) array ordered from the oldest to the newest sample
+        :param rows: channels (rows of the buffer) the block is written to, None for all of them. The other rows are
+        not touched.
+        :return: No return
+        """
+        n = block.shape[1]
+        if(n == 0):
+            return
+        if(rows is None):
+            rows = slice(None)
+        self.count = self.count + n
+        if(n > self.capacity):
+            block = block[:, n - self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        first = min(n, cap - self.pos)
+        self.data[rows, self.pos:self.pos + first] = block[:, :first]
+        self.data[rows, self.pos + cap:self.pos + cap + first] = block[:, :first]
+        rest = n - first
+        if(rest > 0):
+            self.data[rows, :rest] = block[:, first:]
+            self.data[rows, cap:cap + rest] = block[:, first:]
+        self.pos = (self.pos + n) % cap
+
+    def latest(self, n):
+        """
+        Returns a view on the newest samples of the buffer
+        :param n: number of samples requested. It is limited by the capacity and by the number of samples written
+        :return: (channels x n) view ordered from the oldest to the newest sample
+        """
+        n = min(int(n), self.capacity, self.count)
+        end = self.pos + self.capacity
+        return self.data[:, end - n:end]
+
+    def reset(self, value = None):
+        """
+        Empties the buffer without freeing its memory
+        :param value: if given every sample of the buffer is set to this value
+        :return: No return
+        """
+        if(value is not None):
+            self.data.fill(value)
+        self.pos = 0
+        self.count = 0
+
+    def __len__(self):
+        """
+        :return: number of valid samples currently held
+        """
+        return min(self.count, self.capacity)
@@ -0,0 +1,121 @@
+from multiprocessing import shared_memory
+from Ring_buffer import Ring_buffer
+import numpy as np
+
+
+class Shared_ring(Ring_buffer):
+    """
+    Shared_ring class:
+    Ring_buffer whose samples and write position live in a multiprocessing.shared_memory block, so that one process
+    can write the samples and other processes can read them without any transfer. The writer increments a sequence
+    number before and after every write (odd while writing) and the readers use it to detect torn reads.
+    The total number of samples written is counted too. A reset counts as a whole capacity of new samples, so a reader
+    comparing two totals knows that none of the previous samples are left.
+    The writer can also tag the samples with a number (the version of the projection they were fetched with, see
+    Process_hub), the readers get the tag with the samples.
+    """
+    HEADER = 5  # pos, count, sequence number, total, tag
+
+    def __init__(self, nb_channels, capacity, name = None, dtype = np.float32):
+        """
+        _constructor
+        Creates a new shared block or attaches to an existing one
+        :param nb_channels: number of channels (rows)
+        :param capacity: maximum number of samples that can be held per channel
+        :param name: name of an existing block to attach to. If None a new block is created
+        :param dtype: data type of the samples
+        """
+        self.nb_channels = nb_channels
+        self.capacity = max(int(capacity), 1)
+        dtype = np.dtype(dtype)
+        size = self.HEADER * 8 + nb_channels * 2 * self.capacity * dtype.itemsize
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name = name, create = self.owner, size = size)
+        self.name = self.shm.name
+        self.header = np.ndarray((self.HEADER,), dtype = np.int64, buffer = self.shm.buf)
+        self.data = np.ndarray((nb_channels, 2 * self.capacity), dtype = dtype, buffer = self.shm.buf,
+                               offset = self.HEADER * 8)
+        if(self.owner):
+            self.header[:] = 0
+
+    @property
+    def pos(self):
+        return int(self.header[0])
+
+    @pos.setter
+    def pos(self, value):
+        self.header[0] = value
+
+    @property
+    def count(self):
+        return int(self.header[1])
+
+    @count.setter
+    def count(self, value):
+        self.header[1] = value
+
+    def write(self, block):
+        """
+        Overwritten function from Ring_buffer that marks the write with the sequence number
+        :param block: (channels x n) array ordered from the oldest to the newest sample
+        :return: No return
+        """
+        self.header[2] += 1
+        super().write(block)
+        self.header[3] += block.shape[1]
+        self.header[2] += 1
+
+    def reset(self):
+        """
+        Overwritten function from Ring_buffer that marks the reset with the sequence number
+        :return: No return
+        """
+        self.header[2] += 1
+        super().reset()
+        self.header[3] += self.capacity
+        self.header[2] += 1
+
+    def set_tag(self, tag):
+        """
+        Tags the samples currently in the ring
+        :param tag: integer tag
+        :return: No return
+        """
+        self.header[2] += 1
+        self.header[4] = tag
+        self.header[2] += 1
+
+    @property
+    def tag(self):
+        return int(self.header[4])
+
+    def read_latest(self, n, total = False, tag = False):
+        """
+        Returns a consistent copy of the newest samples. It is meant to be used by the reading processes.
+        :param n: number of samples requested
+        :param total: if True the total number of samples written when the copy was taken is returned too
+        :param tag: if True the tag of the samples is returned too
+        :return: (channels x n) array ordered from the oldest to the newest sample, followed by the total and the tag
+        if requested (as a tuple)
+        """
+        while True:
+            seq = int(self.header[2])
+            if(seq % 2 == 0):
+                result = [self.latest(n).copy()]
+                if(total):
+                    result.append(int(self.header[3]))
+                if(tag):
+                    result.append(int(self.header[4]))
+                if(int(self.header[2]) == seq):
+                    return tuple(result) if len(result) > 1 else result[0]
+
+    def close(self):
+        """
+        Detaches from the shared block. The creating process also frees it.
+        :return: No return
+        """
+        self.header = None
+        self.data = None
+        self.shm.close()
+        if(self.owner):
+            self.shm.unlink()
@@ -0,0 +1,78 @@
+from collections import OrderedDict
+import numpy as np
+import scipy.signal as sgn
+from scipy.fft import rfft, rfftfreq, next_fast_len
+import time
+
+
+class Spectrum_engine(object):
+    """
+    Spectrum_engine class:
+    Amplitude spectra of the channels of a window. The real FFT of all the selected channels is computed by one rfft
+    call over the (channels x samples) block, split over several threads (workers). The frequency axis and the taper
+    window (Hann, Hamming... any window of scipy.signal.get_window) only depend on the window length, they are computed
+    once per length and reused at every frame (the plans of the max_plans most recently used lengths are kept). The windows are zero padded to the next length that the FFT handles
+    fast (the window lengths of the plots are odd, a length with a large prime factor is about 10 times slower).
+    The spectra are corrected for the gain of the taper, so that a sine has the same amplitude whatever the taper. The
+    engine is a processor of Acquisition_thread / Process_hub: it is called with the window and can be sent to a
+    Feature_process.
+    """
+    def __init__(self, fs, taper = 'hann', rows = None, average = False, workers = -1, timing = None, max_plans = 4):
+        """
+        _constructor
+        :param fs: sampling frequency
+        :param taper: name of the taper window ('boxcar' for none)
+        :param rows: rows of the window (channels) whose spectra are computed, None for all of them
+        :param average: if True the spectra of the channels are averaged into one spectrum
+        :param workers: number of threads of the FFT (-1 for all the cores)
+        :param timing: Stage_timer in which the duration of the FFT is recorded (optional)
+        :param max_plans: number of window lengths whose plans are kept
+        """
+        self.fs = fs
+        self.taper = taper
+        self.rows = None if rows is None else list(rows)
+        self.average = average
+        self.workers = workers
+        self.timing = timing
+        # (window length, dtype) -> (FFT length, frequency axis, taper), least recently used first
+        self.max_plans = max_plans
+        self.plans = OrderedDict()
+
+    def get_plan(self, n, dtype = np.float64):
+        """
+        Returns the FFT length, the frequency axis and the taper of a window length. They are computed the first time
+        the length is used, the least recently used plan is then dropped if there are more than max_plans.
+        :param n: number of samples of the window
+        :param dtype: data type of the window. The taper has the same type so that a float32 window is not converted
+        to float64 (the FFT of float32 values is about twice as fast)
+        :return: tuple (FFT length, array of the frequencies in Hz, taper window scaled by its gain n / sum)
+        """
+        plan = self.plans.get((n, dtype))
+        if(plan is None):
+            nfft = next_fast_len(n, True)
+            taper = sgn.get_window(self.taper, n)
+            plan = (nfft, rfftfreq(nfft, 1 / self.fs), (taper * (n / taper.sum())).astype(dtype))
+            self.plans[(n, dtype)] = plan
+            while len(self.plans) > self.max_plans:
+                self.plans.popitem(last = False)
+        else:
+            self.plans.move_to_end((n, dtype))
+        return plan
+
+    def __call__(self, window):
+        """
+        Computes the amplitude spectra
+        :param window: (channels x samples) array
+        :return: (freqs, spectra) with spectra the (rows x frequencies) amplitudes, one row if the spectra are averaged
+        """
+        start = time.perf_counter()
+        if(self.rows is not None):
+            window = window[self.rows]
+        n = window.shape[1]
+        nfft, freqs, taper = self.get_plan(n, window.dtype if window.dtype.kind == 'f' else np.float64)
+        spectra = np.abs(rfft(window * taper, nfft, axis = 1, workers = self.workers))
+        if(self.average):
+            spectra = spectra.mean(axis = 0, keepdims = True)
+        if(self.timing is not None):
+            self.timing.record("fft", time.perf_counter() - start)
+        return freqs, spectra
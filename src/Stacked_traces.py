@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class Stacked_traces(object):
+    """
+    Stacked_traces class:
+    Lays out the traces of several channels one below the other so that they are drawn by one curve: the traces are
+    scaled to a common amplitude, channel i is shifted to -i and all the traces are concatenated into one array, so one
+    QPainterPath is built for all the channels instead of one curve per channel. A NaN point is inserted after every
+    channel and the curve is drawn with connect = 'finite', which breaks the path between two channels. (A boolean
+    connect array gives the same path but pyqtgraph builds it point by point, the NaN separators let it use its fast
+    path.)
+    The scale follows the peak amplitude of the traces (it decays slowly after a peak so that the layout does not jump
+    at every frame). The buffers are reused as long as the shape of the traces does not change.
+    """
+    def __init__(self, decay = 0.95):
+        """
+        _constructor
+        :param decay: factor applied to the scale at every frame when the peak amplitude decreases
+        """
+        self.decay = decay
+        self.scale = None
+        self.x = None
+        self.y = None
+        self.offsets = None
+
+    def __call__(self, x, y):
+        """
+        Stacks the traces
+        :param x: x values of the points, shared by all the channels
+        :param y: (channels x points) array
+        :return: (x, y) flat arrays to pass to setData with connect = 'finite'
+        """
+        nb_channels, n = y.shape
+        if(self.y is None or self.y.shape != (nb_channels, n + 1)):
+            self.x = np.full((nb_channels, n + 1), np.nan)
+            self.y = np.full((nb_channels, n + 1), np.nan)
+            self.offsets = -np.arange(nb_channels, dtype = np.float64)[:, None]
+
+        peak = np.nanmax(np.abs(y)) if y.size > 0 and not np.all(np.isnan(y)) else 0
+        if(peak > 0 and np.isfinite(peak)):
+            self.scale = peak if self.scale is None else max(peak, self.decay * self.scale)
+        scale = 1.0 if self.scale is None else self.scale
+
+        # Every trace spans at most [-0.5, 0.5] around its offset
+        np.multiply(y, 0.5 / scale, out = self.y[:, :n])
+        self.y[:, :n] += self.offsets
+        self.x[:, :n] = x
+        return self.x.ravel(), self.y.ravel()
+
+    @staticmethod
+    def ticks(nb_channels, max_labels = 32):
+        """
+        Returns the ticks of the y axis of stacked traces
+        :param nb_channels: number of channels
+        :param max_labels: maximum number of labelled channels
+        :return: list of ticks to pass to AxisItem.setTicks, the channels are numbered from 1
+        """
+        step = max(1, -(-nb_channels // max_labels))
+        return [[(-i, str(i + 1)) for i in range(0, nb_channels, step)]]
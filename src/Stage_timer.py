@@ -0,0 +1,156 @@
+import numpy as np
+import json
+import math
+import time
+
+
+class Stage_timer(object):
+    """
+    Stage_timer class:
+    Lightweight instrumentation of a processing loop. The durations of the stages of every frame (query, conversion,
+    feature extraction, drawing...) are counted in fixed-size histograms with logarithmic bins, so recording costs one
+    perf_counter call and one increment and the memory does not grow with the run time. Percentiles, a text summary or
+    an export to a json file can be requested at any time.
+    Usage per frame: start(), then mark(stage) after every stage and optionally stop(). start() also records the
+    interval between the frames and stop() the total time of the frame. Durations measured elsewhere can be added with
+    record(stage, duration).
+    """
+    def __init__(self, name = "", min_time = 1e-6, max_time = 10.0, bins_per_decade = 20):
+        """
+        _constructor
+        :param name: name shown in the summary and the export
+        :param min_time: lower edge of the first bin in s (shorter durations are counted in the first bin)
+        :param max_time: upper edge of the last bin in s (longer durations are counted in the last bin)
+        :param bins_per_decade: resolution of the histograms
+        """
+        self.name = name
+        self.log_min = math.log10(min_time)
+        self.bins_per_decade = bins_per_decade
+        self.nb_bins = int(round((math.log10(max_time) - self.log_min) * bins_per_decade))
+        self.edges = 10 ** (self.log_min + np.arange(self.nb_bins + 1) / bins_per_decade)
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all the histograms
+        :return: No return
+        """
+        self.hist = {}
+        self.total = {}
+        self.maximum = {}
+        self.frame_start = None
+        self.last = None
+
+    def record(self, stage, duration):
+        """
+        Adds a duration to the histogram of a stage
+        :param stage: name of the stage
+        :param duration: duration in s
+        :return: No return
+        """
+        hist = self.hist.get(stage)
+        if(hist is None):
+            self.total[stage] = 0.0
+            self.maximum[stage] = 0.0
+            hist = self.hist[stage] = np.zeros(self.nb_bins, dtype = np.int64)
+        if(duration > 0):
+            i = int((math.log10(duration) - self.log_min) * self.bins_per_decade)
+            hist[min(max(i, 0), self.nb_bins - 1)] += 1
+        else:
+            hist[0] += 1
+        self.total[stage] += duration
+        if(duration > self.maximum[stage]):
+            self.maximum[stage] = duration
+
+    def start(self):
+        """
+        Starts a frame and records the interval since the start of the previous frame
+        :return: No return
+        """
+        now = time.perf_counter()
+        if(self.frame_start is not None):
+            self.record("interval", now - self.frame_start)
+        self.frame_start = now
+        self.last = now
+
+    def mark(self, stage):
+        """
+        Records the time elapsed since the start of the frame or the previous mark as the duration of a stage
+        :param stage: name of the stage that just finished
+        :return: No return
+        """
+        now = time.perf_counter()
+        if(self.last is not None):
+            self.record(stage, now - self.last)
+        self.last = now
+
+    def stop(self):
+        """
+        Records the total time of the frame
+        :return: No return
+        """
+        if(self.frame_start is not None):
+            self.record("frame", time.perf_counter() - self.frame_start)
+
+    def percentile(self, stage, q):
+        """
+        Estimates a percentile of a stage from its histogram (upper edge of the bin containing it, limited by the
+        longest duration recorded)
+        :param stage: name of the stage
+        :param q: percentile between 0 and 100
+        :return: duration in s
+        """
+        cum = np.cumsum(self.hist[stage])
+        if(cum[-1] == 0):
+            return 0.0
+        i = int(np.searchsorted(cum, q / 100 * cum[-1]))
+        return min(float(self.edges[min(i, self.nb_bins - 1) + 1]), self.maximum[stage])
+
+    def stats(self, percentiles = (50, 90, 99)):
+        """
+        Returns the statistics of every stage
+        :param percentiles: percentiles to compute
+        :return: dictonary stage -> dictonary (count, mean, max and the percentiles, durations in ms)
+        """
+        stats = {}
+        for stage, hist in list(self.hist.items()):
+            count = int(hist.sum())
+            entry = {"count": count,
+                     "mean": 1000 * self.total[stage] / count if count > 0 else 0.0,
+                     "max": 1000 * self.maximum[stage]}
+            for q in percentiles:
+                entry["p{:g}".format(q)] = 1000 * self.percentile(stage, q)
+            stats[stage] = entry
+        return stats
+
+    def summary(self):
+        """
+        Returns a text table of the statistics
+        :return: string with one line per stage (durations in ms)
+        """
+        lines = ["{:<12}{:>7}{:>8}{:>8}{:>8}{:>8}".format(self.name, "n", "mean", "p50", "p99", "max")]
+        for stage, s in self.stats().items():
+            lines.append("{:<12}{:>7}{:>8.2f}{:>8.2f}{:>8.2f}{:>8.2f}".format(stage, s["count"], s["mean"], s["p50"],
+                                                                             s["p99"], s["max"]))
+        return "\n".join(lines)
+
+    def export(self):
+        """
+        Returns the statistics and the histograms in a json serializable form
+        :return: dictonary
+        """
+        return {"name": self.name,
+                "bin_edges_s": self.edges.tolist(),
+                "stats_ms": self.stats(),
+                "histograms": {stage: hist.tolist() for stage, hist in list(self.hist.items())}}
+
+    @staticmethod
+    def save(path, timers):
+        """
+        Writes the export of several timers to a json file
+        :param path: path of the file
+        :param timers: list of Stage_timer objects
+        :return: No return
+        """
+        with open(path, 'w') as f:
+            json.dump([t.export() for t in timers], f, indent = 1)
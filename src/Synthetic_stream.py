@@ -0,0 +1,139 @@
+import pandas as pd
+from Data_stream import Data_stream
+from Ring_buffer import Ring_buffer
+from scipy import signal
+import numpy as np
+import time
+
+
+class Synthetic_stream(Data_stream):
+    """
+    Synthetic_stream class:
+    Generates a multi-channel EMG-like signal in real time, so the plots can be profiled without a Database. Every
+    channel is the sum of band-limited (20-450 Hz) noise modulated by random muscle bursts, white measurement noise
+    and a mains interference. The samples are generated block-wise (all channels at once) each time the window is
+    requested and are written into a Ring_buffer, the filter states are kept between the blocks so the signal is
+    continuous.
+    The options are taken from gen_params (see defaults) so that the stream can also be created by a Process_hub.
+    """
+    defaults = {"noise": 0.01,          # std of the white measurement noise
+                "mains": 0.02,          # amplitude of the mains interference
+                "mains_freq": 50.0,     # frequency of the mains interference in Hz
+                "burst_rate": 0.5,      # mean number of bursts per second and channel
+                "burst_amp": 0.5,       # amplitude of the EMG during a burst
+                "burst_len": 0.2,       # time to the peak of a burst in s
+                "speed": 1.0,           # generation speed factor, 1 is real time
+                "seed": None}
+
+    def __init__(self, gen_params, **options):
+        """
+        _constructor
+        :param gen_params: dictonary of parameters (Fs, win_len, channels and optionally the keys of defaults)
+        :param options: overwrites the options of gen_params (see defaults)
+        """
+        super().__init__()
+
+        self.fs = gen_params["Fs"]
+        self.window_length = gen_params["win_len"]
+        self.channels = [str(c) for c in gen_params["channels"]]
+        self.options = {key: options.get(key, gen_params.get(key, value)) for key, value in self.defaults.items()}
+        nb_channels = len(self.channels)
+
+        self.rng = np.random.default_rng(self.options["seed"])
+        self.buffer = Ring_buffer(nb_channels, self.window_length)
+        self.mains_phase = self.rng.uniform(0, 2 * np.pi, (nb_channels, 1))
+
+        # Band-pass of the EMG, the upper edge is limited by the Nyquist frequency
+        high = min(450.0, 0.45 * self.fs)
+        self.sos = signal.butter(2, [min(20.0, high / 2), high], btype = 'bandpass', fs = self.fs, output = 'sos')
+        self.sos_state = np.zeros((self.sos.shape[0], nb_channels, 2))
+
+        # Burst envelope: impulses (burst onsets) filtered by a critically damped second order low-pass whose impulse
+        # response rises to 1 after burst_len and decays afterwards
+        a = np.exp(-1.0 / (self.options["burst_len"] * self.fs))
+        self.env_b = np.array([np.e * (1 - a) / a])
+        self.env_a = np.array([1.0, -2 * a, a * a])
+        self.env_state = np.zeros((nb_channels, 2))
+
+        self.start_time = None
+        self.count = 0
+
+    def generate(self, n):
+        """
+        Generates the next n samples of every channel
+        :param n: number of samples
+        :return: (channels x n) array ordered from the oldest to the newest sample
+        """
+        nb_channels = len(self.channels)
+        opt = self.options
+        onsets = (self.rng.random((nb_channels, n)) < opt["burst_rate"] / self.fs).astype(np.float64)
+        envelope, self.env_state = signal.lfilter(self.env_b, self.env_a, onsets, axis = 1, zi = self.env_state)
+        emg, self.sos_state = signal.sosfilt(self.sos, self.rng.standard_normal((nb_channels, n)), axis = 1,
+                                             zi = self.sos_state)
+        t = (self.count + np.arange(n)) / self.fs
+        out = opt["burst_amp"] * envelope * emg
+        out += opt["noise"] * self.rng.standard_normal((nb_channels, n))
+        out += opt["mains"] * np.sin(2 * np.pi * opt["mains_freq"] * t + self.mains_phase)
+        return out.astype(np.float32)
+
+    def get_Array(self):
+        """
+        Overwritten function from Data_stream that generates the samples elapsed since the last call. At the first call
+        a whole window is generated.
+        :return: (channels x samples) view on the buffer ordered from the oldest to the newest sample
+        """
+        now = time.perf_counter()
+        if(self.start_time is None):
+            self.start_time = now - self.window_length / (self.fs * self.options["speed"])
+        if(self.buffer.capacity < self.window_length):
+            buffer = Ring_buffer(self.buffer.nb_channels, self.window_length)
+            buffer.write(self.buffer.latest(self.buffer.capacity))
+            self.buffer = buffer
+
+        n = int((now - self.start_time) * self.fs * self.options["speed"]) - self.count
+        if(n > 0):
+            # After a long pause only the samples that fit in the window are generated
+            skipped = max(n - self.buffer.capacity, 0)
+            self.count = self.count + skipped
+            self.buffer.write(self.generate(n - skipped))
+            self.count = self.count + n - skipped
+        return self.buffer.latest(self.window_length)
+
+    def get_Window(self):
+        """
+        Overwritten function from Data_stream that returns the current window as a dataframe
+        :return: A dataframe with the index and the channels as columns (newest row first)
+        """
+        arr = self.get_Array()
+        window = pd.DataFrame(arr[:, ::-1].T, columns = self.channels)
+        window.insert(0, "index", np.arange(self.count - arr.shape[1], self.count)[::-1])
+        return window
+
+    def get_Count(self):
+        """
+        Overwritten function from Data_stream that returns the number of samples generated so far
+        :return: number of samples
+        """
+        return self.count
+
+    def get_channels(self):
+        """
+        Overwritten function from Data_stream that returns the names of the generated channels
+        :return: list of channel names in the order of the rows of get_Array
+        """
+        return self.channels
+
+    def set_winLen(self, length: int):
+        """
+        Sets the window length
+        :param length: window_lenght in number of elements
+        :return: No return
+        """
+        self.window_length = length
+
+    def get_winLen(self):
+        """
+        Returns the current window length
+        :return: window length in number of elements
+        """
+        return self.window_length
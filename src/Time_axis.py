@@ -0,0 +1,41 @@
+import pyqtgraph as pg
+
+
+class Time_axis(pg.AxisItem):
+    """
+    Time_axis class:
+    Time axis of a plot whose curve is drawn with fixed time stamps (s since the plot was opened). The axis labels the
+    times relative to an origin (the time of the newest value), so that the newest value is shown at 0 s and the older
+    ones at negative times while the x data of the curve never has to be rewritten: only the origin changes at every
+    frame. The ticks are placed at round values of the relative time.
+    """
+    def __init__(self, *args, **kwargs):
+        """
+        _constructor
+        Same arguments as pg.AxisItem
+        """
+        super().__init__(*args, **kwargs)
+        self.origin = 0.0
+
+    def set_origin(self, origin):
+        """
+        Sets the time shown as 0 and redraws the axis
+        :param origin: time stamp of the origin in the coordinates of the data
+        :return: No return
+        """
+        self.origin = origin
+        self.picture = None
+        self.update()
+
+    def tickValues(self, minVal, maxVal, size):
+        """
+        Overwritten function of pg.AxisItem that computes the ticks in relative time
+        """
+        return [(spacing, [v + self.origin for v in values])
+                for spacing, values in super().tickValues(minVal - self.origin, maxVal - self.origin, size)]
+
+    def tickStrings(self, values, scale, spacing):
+        """
+        Overwritten function of pg.AxisItem that labels the ticks with the relative time
+        """
+        return super().tickStrings([v - self.origin for v in values], scale, spacing)
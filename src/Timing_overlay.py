@@ -0,0 +1,74 @@
+from PyQt5 import QtGui
+from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtWidgets import QLabel, QShortcut, QFileDialog
+from Stage_timer import Stage_timer
+
+
+class Timing_overlay(QLabel):
+    """
+    Timing_overlay class:
+    On-demand overlay that shows the statistics of the Stage_timers of a plot (and of its acquisition and stream) on
+    top of the plot. F3 shows/hides the overlay, F4 exports the histograms to a json file. The text is only refreshed
+    while the overlay is visible and at its own low rate, so it costs nothing in the frame loop.
+    """
+    def __init__(self, parent, timers, interval = 500):
+        """
+        _constructor
+        :param parent: the plot widget on which the overlay is shown
+        :param timers: list of Stage_timer objects (None entries are ignored)
+        :param interval: refresh interval of the text in ms
+        """
+        super().__init__(parent)
+        self.timers = [t for t in timers if t is not None]
+        self.setFont(QtGui.QFontDatabase.systemFont(QtGui.QFontDatabase.FixedFont))
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 170); color: white; padding: 4px;")
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.hide()
+
+        self.timer = QTimer()
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.refresh)
+
+        self.toggle_shortcut = QShortcut(QtGui.QKeySequence("F3"), parent)
+        self.toggle_shortcut.activated.connect(self.toggle)
+        self.export_shortcut = QShortcut(QtGui.QKeySequence("F4"), parent)
+        self.export_shortcut.activated.connect(self.export)
+
+    def toggle(self):
+        """
+        Slot that shows or hides the overlay
+        :return: No return
+        """
+        if(self.isVisible()):
+            self.timer.stop()
+            self.hide()
+        else:
+            self.refresh()
+            self.show()
+            self.raise_()
+            self.timer.start()
+
+    def stop(self):
+        """
+        Hides the overlay and stops its refresh timer (the plot is closed)
+        :return: No return
+        """
+        self.timer.stop()
+        self.hide()
+
+    def refresh(self):
+        """
+        Updates the text with the current statistics (durations in ms)
+        :return: No return
+        """
+        self.setText("\n\n".join(t.summary() for t in self.timers))
+        self.adjustSize()
+
+    def export(self):
+        """
+        Slot that writes the statistics and histograms of all the timers to a json file chosen by the user
+        :return: No return
+        """
+        path, _ = QFileDialog.getSaveFileName(self.parentWidget(), "Export timings", "timings.json", "JSON (*.json)")
+        if(path):
+            Stage_timer.save(path, self.timers)
@@ -0,0 +1,237 @@
+"""
+Benchmark of the plots: every plot type is driven for a number of frames on an offscreen Qt platform with a synthetic
+(or replayed) stream, for several channel counts and window lengths. For every frame the time needed to fetch the
+window from the stream, to compute the features, to update and render the plot and the total are measured and
+reported as percentiles (in ms).
+
+Example: python benchmark.py --plots Heatmap Lineplot_Raw --channels 16 64 256 --windows 100 500 --frames 200
+"""
+
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+from Synthetic_stream import Synthetic_stream
+from File_stream import File_stream
+import numpy as np
+import contextlib
+import argparse
+import time
+import csv
+
+
+class Bench_acquisition(object):
+    """
+    Bench_acquisition class:
+    Synchronous replacement of the Acquisition_thread with the same subscription interface. The window is fetched from
+    the stream when the plot asks for it, so the fetch and feature times of every frame can be measured.
+    """
+    def __init__(self, stream):
+        """
+        _constructor
+        :param stream: A Data_stream object
+        """
+        self.stream = stream
+        self.default_length = stream.get_winLen()
+        self.subscribers = {}
+        self.processors = {}
+        self.fetch_time = 0
+        self.feature_time = 0
+        self.count = None
+
+    def get_channels(self):
+        """
+        :return: list of channel names of the stream
+        """
+        return self.stream.get_channels()
+
+    def get_timers(self):
+        """
+        :return: list with the Stage_timer of the stream (if it has one)
+        """
+        return [getattr(self.stream, "timing", None)]
+
+    def get_winLen(self):
+        """
+        :return: window length of the stream in number of elements
+        """
+        return self.stream.get_winLen()
+
+    def get_defaultLen(self):
+        """
+        :return: window length the stream was created with
+        """
+        return self.default_length
+
+    def subscribe(self, owner, length: int, processor = None, channels = None):
+        """
+        Subscribes a plot or updates its window length, processor and channels
+        :param owner: the subscribing object
+        :param length: window length needed by the subscriber in number of elements
+        :param processor: callable applied to the window of the subscriber (None for the raw window)
+        :param channels: numbers of the channels the subscriber needs, None for all of them
+        :return: No return
+        """
+        self.subscribers[owner] = max(int(length), 1)
+        self.processors[owner] = processor
+        self.stream.set_winLen(max(self.subscribers.values()))
+        self.stream.set_projection(channels)
+
+    def unsubscribe(self, owner):
+        """
+        Removes a subscriber
+        :param owner: the subscribed object
+        :return: No return
+        """
+        self.subscribers.pop(owner, None)
+        self.processors.pop(owner, None)
+
+    def get_frame(self, owner):
+        """
+        The plots are updated directly by the benchmark, so there is no frame counter
+        :return: 0
+        """
+        return 0
+
+    def get_slice(self, owner):
+        """
+        Fetches the window of the owner from the stream and measures the time it took
+        :param owner: subscribed object
+        :return: (channels x samples) array
+        """
+        start = time.perf_counter()
+        window = np.array(self.stream.get_Array()[:, -self.subscribers[owner]:])
+        self.count = self.stream.get_Count()
+        self.fetch_time = time.perf_counter() - start
+        return window
+
+    def get_result(self, owner):
+        """
+        Fetches the window of the owner and applies its processor. Both times are measured.
+        :param owner: subscribed object
+        :return: result of the processor or the window if the owner has no processor
+        """
+        window = self.get_slice(owner)
+        start = time.perf_counter()
+        processor = self.processors.get(owner)
+        if(processor is None):
+            result = window
+        elif(getattr(processor, "incremental", False)):
+            result = processor(window, self.count)
+        else:
+            result = processor(window)
+        self.feature_time = time.perf_counter() - start
+        return result
+
+
+def grid_form(nb_channels):
+    """
+    Creates a square sensor layout for the heatmap
+    :param nb_channels: number of channels
+    :return: matrix with the channel numbers (1..nb_channels) and 0 for the empty cells
+    """
+    side = int(np.ceil(np.sqrt(nb_channels)))
+    form = np.zeros(side * side, dtype = int)
+    form[:nb_channels] = np.arange(1, nb_channels + 1)
+    return form.reshape(side, side)
+
+
+def create_plot(name, stream, acq, fs, feature):
+    """
+    Creates a plot of the given type on the benchmark acquisition and stops its timers
+    :return: tuple (plot, its update function)
+    """
+    if(name == "Heatmap"):
+        from RT_Heatmap import RT_Heatmap
+        plot = RT_Heatmap(stream, grid_form(len(acq.get_channels())), feature, fs, acquisition = acq)
+        update = plot.update_img
+    elif(name == "Lineplot"):
+        from RT_Lineplot import RT_Lineplot
+        plot = RT_Lineplot(stream, feature, fs, acquisition = acq)
+        update = plot.update_plt
+    elif(name == "Lineplot_Raw"):
+        from RT_Lineplot_Raw import RT_Lineplot_Raw
+        plot = RT_Lineplot_Raw(stream, feature, fs, acquisition = acq)
+        update = plot.update_plt
+    elif(name == "Fourier_Raw"):
+        from RT_Fourier_Raw import RT_Fourier_Raw
+        plot = RT_Fourier_Raw(stream, feature, fs, acquisition = acq)
+        update = plot.update_plt
+    else:
+        raise ValueError("Unknown plot {}".format(name))
+    plot.timer.stop()
+    plot.show()
+    return plot, update
+
+
+def run(app, name, gen_params, frames, warmup, feature, source):
+    """
+    Drives one plot for a number of frames
+    :return: dictonary stage -> array of the times (in s) of every frame
+    """
+    stream = File_stream(gen_params) if source is not None else Synthetic_stream(gen_params, seed = 0)
+    acq = Bench_acquisition(stream)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        plot, update = create_plot(name, stream, acq, gen_params["Fs"], feature)
+        times = {stage: np.zeros(frames) for stage in ("fetch", "feature", "render", "total")}
+        for i in range(warmup + frames):
+            start = time.perf_counter()
+            update()
+            plot.repaint()
+            app.processEvents()
+            total = time.perf_counter() - start
+            if(i >= warmup):
+                times["fetch"][i - warmup] = acq.fetch_time
+                times["feature"][i - warmup] = acq.feature_time
+                times["render"][i - warmup] = total - acq.fetch_time - acq.feature_time
+                times["total"][i - warmup] = total
+        plot.close()
+    return times
+
+
+def main():
+    """
+    Parses the arguments, runs the benchmark of every combination and prints the percentiles
+    :return: No return
+    """
+    parser = argparse.ArgumentParser(description = "Frame latency benchmark of the plots")
+    parser.add_argument("--plots", nargs = "+", default = ["Heatmap", "Lineplot", "Lineplot_Raw", "Fourier_Raw"])
+    parser.add_argument("--channels", nargs = "+", type = int, default = [16, 64, 256])
+    parser.add_argument("--windows", nargs = "+", type = int, default = [100, 500, 1000], help = "window lengths in ms")
+    parser.add_argument("--frames", type = int, default = 200)
+    parser.add_argument("--warmup", type = int, default = 10)
+    parser.add_argument("--fs", type = int, default = 2400)
+    parser.add_argument("--feature", default = "MAV")
+    parser.add_argument("--file", default = None, help = "replay this file instead of the synthetic signal")
+    parser.add_argument("--percentiles", nargs = "+", type = float, default = [50, 90, 99])
+    parser.add_argument("--csv", default = None, help = "also write the results to this csv file")
+    args = parser.parse_args()
+
+    app = QApplication([])
+    rows = []
+    header = "{:<13}{:>6}{:>8}  {:<8}".format("plot", "chn", "win[ms]", "stage") + \
+             "".join("{:>10}".format("p{:g}[ms]".format(p)) for p in args.percentiles)
+    print(header)
+    for name in args.plots:
+        for nb_channels in args.channels:
+            for window in args.windows:
+                gen_params = {"Fs": args.fs,
+                              "win_len": int(window * args.fs / 1000) + 1,
+                              "channels": ["channel" + str(i) for i in range(1, nb_channels + 1)],
+                              "file": args.file}
+                times = run(app, name, gen_params, args.frames, args.warmup, args.feature, args.file)
+                for stage, values in times.items():
+                    pct = np.percentile(values, args.percentiles) * 1000
+                    rows.append([name, nb_channels, window, stage] + list(pct))
+                    print("{:<13}{:>6}{:>8}  {:<8}".format(name, nb_channels, window, stage) +
+                          "".join("{:>10.3f}".format(p) for p in pct))
+
+    if(args.csv is not None):
+        with open(args.csv, 'w', newline = '') as f:
+            writer = csv.writer(f)
+            writer.writerow(["plot", "channels", "window_ms", "stage"] + ["p{:g}_ms".format(p) for p in args.percentiles])
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
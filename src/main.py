@@ -1,11 +1,13 @@
 from MainWindow import MainWindow
 from PyQt5.QtWidgets import QApplication
+import multiprocessing
 import sqlalchemy.sql.default_comparator
 import sklearn.utils._weight_vector
 
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
     app = QApplication([])
     win = MainWindow()
     win.show()
@@ -0,0 +1,63 @@
+import ast
+import os
+import sqlite3
+import numpy as np
+import pytest
+from Incremental_features import Incremental_features
+
+# Features the DB server computes (see DB_stream.aggregates)
+server_features = sorted(n for n, kind in Incremental_features.features.items() if kind in Incremental_features.sql_sums)
+
+
+def server_side(window, name):
+    """
+    Evaluates the SQL running sum of a feature with sqlite over a table holding the window and derives the feature like
+    DB_stream.get_Aggregate does
+    """
+    db = sqlite3.connect(":memory:")
+    columns = ["c{}".format(i) for i in range(window.shape[0])]
+    db.execute("CREATE TABLE w ({})".format(", ".join(c + " REAL" for c in columns)))
+    db.executemany("INSERT INTO w VALUES ({})".format(", ".join("?" * len(columns))), window.T.tolist())
+    expression = Incremental_features.sql_sums[Incremental_features.features[name]]
+    row = db.execute("SELECT count(*), {} FROM w".format(", ".join(expression.format(c) for c in columns))).fetchone()
+    return Incremental_features.feature_value(name, np.array(row[1:], dtype = np.float64), row[0])
+
+
+def window(nb_channels = 4, length = 301):
+    return np.random.RandomState(1).randn(nb_channels, length) * 3 + 0.7
+
+
+@pytest.mark.parametrize("name", server_features)
+def test_server_sums_match_incremental_features(name):
+    w = window()
+    np.testing.assert_allclose(server_side(w, name), Incremental_features([name])(w, None), rtol = 1e-9)
+
+
+@pytest.mark.parametrize("name", server_features)
+def test_server_sums_match_feature_processor(name):
+    # Needs the real feature extraction of bioml
+    pytest.importorskip("bioml.Feature_Extraction")
+    from Feature_processor import Feature_processor
+    w = window()
+    if(not Feature_processor.confirmed(name, 2400)):
+        pytest.skip("{} differs from FE.MFE, it is not computed by the server".format(name))
+    np.testing.assert_allclose(server_side(w, name), Feature_processor(name, 2400)(w), rtol = 1e-6)
+
+
+@pytest.mark.skipif("RT_EMG_TEST_PARAMS" not in os.environ,
+                    reason = "set RT_EMG_TEST_PARAMS to a parameter file (like default_par.txt) of a static recording")
+@pytest.mark.parametrize("name", server_features)
+def test_get_aggregate_matches_feature_processor(name):
+    from DB_stream import DB_stream
+    from Feature_processor import Feature_processor
+    with open(os.environ["RT_EMG_TEST_PARAMS"], 'r') as f:
+        params = ast.literal_eval(f.read())
+    stream = DB_stream(params, incremental = False)
+    try:
+        length = 500
+        stream.set_winLen(length)
+        w = np.array(stream.get_Array(), dtype = np.float64)
+        index, values = stream.get_Aggregate(name, length)
+        np.testing.assert_allclose(values, Feature_processor(name, params["Fs"])(w), rtol = 1e-6)
+    finally:
+        stream.close()
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from scipy.signal import convolve2d
+from Grid_interpolator import Grid_interpolator
+
+
+def layout():
+    form = np.zeros((4, 6))
+    form[[0, 1, 3, 3], [0, 4, 2, 5]] = [1, 2, 3, 4]
+    return form
+
+
+def test_kernel_matches_convolution():
+    """
+    The 'kernel' method keeps the sensor values and fills the empty cells like the convolution it replaces
+    """
+    form = layout()
+    kernel = np.array([[1, 2, 1], [2, 4, 2], [1, 2, 1]], dtype = float)
+    values = np.array([1.0, -2.0, 3.5, 0.25])
+    grid = np.zeros(form.shape)
+    grid[form != 0] = values[form[form != 0].astype(int) - 1]
+    expected = convolve2d(grid, kernel, boundary = 'wrap', mode = 'same') / kernel.sum()
+    expected[form != 0] = grid[form != 0]
+
+    img = Grid_interpolator(form, kernel)(values)
+    assert np.allclose(img, expected)
+
+
+def test_idw_keeps_sensor_values():
+    form = layout()
+    values = np.array([1.0, -2.0, 3.5, 0.25])
+    img = Grid_interpolator(form, None, 'idw', neighbours = 3)(values)
+    cells = form != 0
+    assert np.allclose(img[cells], values[form[cells].astype(int) - 1])
+
+
+def test_gaussian_far_from_sensors():
+    """
+    A pixel 40 cells away from the sensors (sigma 1) still gets a finite value, the one of the nearest sensor
+    """
+    form = np.zeros((1, 42))
+    form[0, :2] = [1, 2]
+    img = Grid_interpolator(form, None, 'gaussian', neighbours = 2, sigma = 1.0)(np.array([1.0, 3.0]))
+    assert np.all(np.isfinite(img))
+    assert img[0, -1] == pytest.approx(3.0)
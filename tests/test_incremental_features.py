@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from Incremental_features import Incremental_features
+
+
+def sliding_windows(nb_channels = 3, length = 200, steps = (0, 1, 7, 40, 3, 250, 12, 199, 5), seed = 0):
+    """
+    Simulates a stream: yields (window, count) after every block of new samples
+    """
+    signal = np.random.RandomState(seed).randn(nb_channels, length + sum(steps)) + 0.5
+    count = length
+    yield signal[:, :count], count
+    for step in steps:
+        count = count + step
+        yield signal[:, count - length:count], count
+
+
+@pytest.mark.parametrize("name", sorted(Incremental_features.features))
+def test_sliding_update_matches_full_computation(name):
+    engine = Incremental_features([name])
+    for window, count in sliding_windows():
+        expected = Incremental_features([name])(window, None)
+        np.testing.assert_allclose(engine(window, count), expected, rtol = 1e-9, atol = 1e-9)
+
+
+def test_several_features_share_one_engine():
+    names = sorted(Incremental_features.features)
+    engine = Incremental_features(names)
+    for window, count in sliding_windows():
+        expected = np.concatenate([Incremental_features([n])(window, None) for n in names])
+        np.testing.assert_allclose(engine(window, count), expected, rtol = 1e-9, atol = 1e-9)
+
+
+def test_unsupported_feature():
+    with pytest.raises(ValueError):
+        Incremental_features(["SSC"])
+
+
+def test_incremental_path_matches_feature_extraction():
+    # Needs the real feature extraction of bioml
+    FE = pytest.importorskip("bioml.Feature_Extraction")
+    from Feature_processor import Feature_processor
+    from Feature_registry import registry
+    fs = 2400
+    names = [n for n in registry.names() if n in Incremental_features.features]
+    for name in names:
+        incremental = Feature_processor(name, fs)
+        for window, count in sliding_windows():
+            expected = Feature_processor(name, fs)(window)
+            np.testing.assert_allclose(incremental(window, count), expected, rtol = 1e-6, atol = 1e-9)
+            np.testing.assert_allclose(expected, FE.MFE(window, registry.resolve((name,)), fs), rtol = 1e-6, atol = 1e-9)
+    unconfirmed = [n for n in names if not Feature_processor.confirmed(n, fs)]
+    if(len(unconfirmed) > 0):
+        pytest.skip("Computed over the whole window (definition differs from FE.MFE): {}".format(unconfirmed))
@@ -92,6 +92,36 @@ class Ui_Form(object):
 
         self.gridLayout.addWidget(self.sv_file, 6, 1, 1, 1)
 
+        self.label_6 = QLabel(Form)
+        self.label_6.setObjectName(u"label_6")
+        self.label_6.setEnabled(True)
+
+        self.gridLayout.addWidget(self.label_6, 7, 0, 1, 1)
+
+        self.InterpBox = QComboBox(Form)
+        self.InterpBox.setObjectName(u"InterpBox")
+        self.InterpBox.setEnabled(True)
+
+        self.gridLayout.addWidget(self.InterpBox, 7, 1, 1, 1)
+
+        self.Pushdown_CheckBox = QCheckBox(Form)
+        self.Pushdown_CheckBox.setObjectName(u"Pushdown_CheckBox")
+
+        self.gridLayout.addWidget(self.Pushdown_CheckBox, 8, 0, 1, 2)
+
+        self.label_7 = QLabel(Form)
+        self.label_7.setObjectName(u"label_7")
+        self.label_7.setEnabled(True)
+
+        self.gridLayout.addWidget(self.label_7, 9, 0, 1, 2)
+
+        self.FeatureList = QListWidget(Form)
+        self.FeatureList.setObjectName(u"FeatureList")
+        self.FeatureList.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.FeatureList.setMaximumSize(QSize(16777215, 90))
+
+        self.gridLayout.addWidget(self.FeatureList, 10, 0, 1, 2)
+
 
         self.retranslateUi(Form)
 
@@ -108,6 +138,10 @@ class Ui_Form(object):
         self.CnclButton_3.setText(QCoreApplication.translate("Form", u"Cancel", None))
         self.label.setText(QCoreApplication.translate("Form", u"Window size [ms]", None))
         self.sv_file.setText(QCoreApplication.translate("Form", u"Save file", None))
+        self.label_6.setText(QCoreApplication.translate("Form", u"Interpolation", None))
+        self.Pushdown_CheckBox.setText(QCoreApplication.translate("Form", u"Compute feature in the Database", None))
+        self.label_7.setText(QCoreApplication.translate("Form", u"Side by side features", None))
+        self.Pushdown_CheckBox.setToolTip(QCoreApplication.translate("Form", u"MAV, RMS and VAR can be computed by the Database server, only the feature values are then transferred", None))
     # retranslateUi
 
 
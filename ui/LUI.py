@@ -63,6 +63,31 @@ class Ui_Form(object):
         self.label.setEnabled(True)
         self.gridLayout.addWidget(self.label, 1, 0, 1, 1)
 
+        self.historyBox = QSpinBox(Form)
+        self.historyBox.setObjectName(u"historyBox")
+        self.historyBox.setEnabled(True)
+        self.gridLayout.addWidget(self.historyBox, 5, 1, 1, 1)
+
+        self.label_5 = QLabel(Form)
+        self.label_5.setObjectName(u"label_5")
+        self.label_5.setEnabled(True)
+        self.gridLayout.addWidget(self.label_5, 5, 0, 1, 1)
+
+        self.stackedBox = QCheckBox(Form)
+        self.stackedBox.setObjectName(u"stackedBox")
+        self.stackedBox.setEnabled(True)
+        self.gridLayout.addWidget(self.stackedBox, 6, 0, 1, 2)
+
+        self.taperBox = QComboBox(Form)
+        self.taperBox.setObjectName(u"taperBox")
+        self.taperBox.setEnabled(True)
+        self.gridLayout.addWidget(self.taperBox, 7, 1, 1, 1)
+
+        self.label_6 = QLabel(Form)
+        self.label_6.setObjectName(u"label_6")
+        self.label_6.setEnabled(True)
+        self.gridLayout.addWidget(self.label_6, 7, 0, 1, 1)
+
 
         self.retranslateUi(Form)
 
@@ -72,6 +97,9 @@ class Ui_Form(object):
     def retranslateUi(self, Form):
         Form.setWindowTitle(QCoreApplication.translate("Form", u"Form", None))
         self.label_4.setText(QCoreApplication.translate("Form", u"Channel", None))
+        self.label_5.setText(QCoreApplication.translate("Form", u"History [frames]", None))
+        self.stackedBox.setText(QCoreApplication.translate("Form", u"Stacked channels", None))
+        self.label_6.setText(QCoreApplication.translate("Form", u"Taper", None))
         self.label_3.setText(QCoreApplication.translate("Form", u"Filter", None))
         self.label_2.setText(QCoreApplication.translate("Form", u"Step size [ms]", None))
         self.label.setText(QCoreApplication.translate("Form", u"Window size [ms]", None))
@@ -44,16 +44,16 @@ class Ui_MainWindow(object):
 
         self.FsLabel = QLabel(self.centralwidget)
         self.FsLabel.setObjectName(u"FsLabel")
-        self.gridLayout.addWidget(self.FsLabel,18,0,1,1)
+        self.gridLayout.addWidget(self.FsLabel,22,0,1,1)
 
         self.FsSpin.setObjectName(u"FsSpin")
         self.FsSpin.setFixedWidth(150)
-        self.gridLayout.addWidget(self.FsSpin,18,1,1,1)
+        self.gridLayout.addWidget(self.FsSpin,22,1,1,1)
 
 
         self.Serial_Port_LE.setObjectName(u"Serial_Port_LE")
         self.Serial_Port_LE.setEnabled(False)
-        self.gridLayout.addWidget(self.Serial_Port_LE, 14, 1, 1, 1)
+        self.gridLayout.addWidget(self.Serial_Port_LE, 17, 1, 1, 1)
 
         self.Subject_id_LE.setObjectName(u"Subject_id_LE")
         self.gridLayout.addWidget(self.Subject_id_LE, 9, 1, 1, 1)
@@ -63,7 +63,7 @@ class Ui_MainWindow(object):
 
         self.Baudrate_LE.setObjectName(u"Baudrate_LE")
         self.Baudrate_LE.setEnabled(False)
-        self.gridLayout.addWidget(self.Baudrate_LE, 15, 1, 1, 1)
+        self.gridLayout.addWidget(self.Baudrate_LE, 18, 1, 1, 1)
 
         self.User_LE.setObjectName(u"User_LE")
         self.gridLayout.addWidget(self.User_LE, 2, 1, 1, 1)
@@ -75,7 +75,7 @@ class Ui_MainWindow(object):
         self.label_13 = QLabel(self.centralwidget)
         self.label_13.setObjectName(u"label_13")
         self.label_13.setEnabled(False)
-        self.gridLayout.addWidget(self.label_13, 14, 0, 1, 1)
+        self.gridLayout.addWidget(self.label_13, 17, 0, 1, 1)
 
         self.DB_Port_LE.setObjectName(u"DB_Port_LE")
         self.gridLayout.addWidget(self.DB_Port_LE, 4, 1, 1, 1)
@@ -85,12 +85,12 @@ class Ui_MainWindow(object):
         self.gridLayout.addWidget(self.label_5, 4, 0, 1, 1)
 
         self.horizontalSpacer_5 = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
-        self.gridLayout.addItem(self.horizontalSpacer_5, 17, 0, 1, 7)
+        self.gridLayout.addItem(self.horizontalSpacer_5, 21, 0, 1, 7)
 
         self.label_14 = QLabel(self.centralwidget)
         self.label_14.setObjectName(u"label_14")
         self.label_14.setEnabled(False)
-        self.gridLayout.addWidget(self.label_14, 15, 0, 1, 1)
+        self.gridLayout.addWidget(self.label_14, 18, 0, 1, 1)
 
         self.label_7 = QLabel(self.centralwidget)
         self.label_7.setObjectName(u"label_7")
@@ -109,11 +109,11 @@ class Ui_MainWindow(object):
 
         self.label_12 = QLabel(self.centralwidget)
         self.label_12.setObjectName(u"label_12")
-        self.gridLayout.addWidget(self.label_12, 13, 1, 1, 5)
+        self.gridLayout.addWidget(self.label_12, 16, 1, 1, 5)
 
         self.label_17 = QLabel(self.centralwidget)
         self.label_17.setObjectName(u"label_17")
-        self.gridLayout.addWidget(self.label_17, 18, 2, 1, 1)
+        self.gridLayout.addWidget(self.label_17, 22, 2, 1, 1)
 
         self.DB_name_LE.setObjectName(u"DB_name_LE")
         self.gridLayout.addWidget(self.DB_name_LE, 1, 1, 1, 1)
@@ -136,7 +136,7 @@ class Ui_MainWindow(object):
         self.label_15 = QLabel(self.centralwidget)
         self.label_15.setObjectName(u"label_15")
         self.label_15.setEnabled(False)
-        self.gridLayout.addWidget(self.label_15, 16, 0, 1, 1)
+        self.gridLayout.addWidget(self.label_15, 19, 0, 1, 1)
 
         self.label_10 = QLabel(self.centralwidget)
         self.label_10.setObjectName(u"label_10")
@@ -147,7 +147,7 @@ class Ui_MainWindow(object):
         self.gridLayout.addWidget(self.Host_LE, 3, 1, 1, 1)
 
         self.horizontalSpacer = QSpacerItem(811, 15, QSizePolicy.Expanding, QSizePolicy.Minimum)
-        self.gridLayout.addItem(self.horizontalSpacer, 12, 0, 1, 7)
+        self.gridLayout.addItem(self.horizontalSpacer, 15, 0, 1, 7)
 
         self.label_4 = QLabel(self.centralwidget)
         self.label_4.setObjectName(u"label_4")
@@ -163,11 +163,11 @@ class Ui_MainWindow(object):
 
         self.TimeoutSpinBox.setObjectName(u"TimeoutSpinBox")
         self.TimeoutSpinBox.setEnabled(False)
-        self.gridLayout.addWidget(self.TimeoutSpinBox, 16, 1, 1, 1)
+        self.gridLayout.addWidget(self.TimeoutSpinBox, 19, 1, 1, 1)
 
 
         self.Create_Plot_Bttn.setObjectName(u"Create_Plot_Bttn")
-        self.gridLayout.addWidget(self.Create_Plot_Bttn, 18, 5, 1, 1)
+        self.gridLayout.addWidget(self.Create_Plot_Bttn, 22, 5, 1, 1)
 
         self.Condition_LE.setObjectName(u"Condition_LE")
         self.gridLayout.addWidget(self.Condition_LE, 10, 1, 1, 1)
@@ -180,7 +180,7 @@ class Ui_MainWindow(object):
         self.Serial_radiobttn.setEnabled(False)
         self.Serial_radiobttn.setCheckable(True)
         self.Serial_radiobttn.setAutoRepeatDelay(299)
-        self.gridLayout.addWidget(self.Serial_radiobttn, 13, 0, 1, 1)
+        self.gridLayout.addWidget(self.Serial_radiobttn, 16, 0, 1, 1)
 
         self.label_9 = QLabel(self.centralwidget)
         self.label_9.setObjectName(u"label_9")
@@ -188,7 +188,40 @@ class Ui_MainWindow(object):
 
 
         self.PlotBox.setObjectName(u"PlotBox")
-        self.gridLayout.addWidget(self.PlotBox, 18, 4, 1, 1)
+        self.gridLayout.addWidget(self.PlotBox, 22, 4, 1, 1)
+
+        self.File_radio_bttn = QRadioButton(self.centralwidget)
+        self.File_radio_bttn.setObjectName(u"File_radio_bttn")
+        self.gridLayout.addWidget(self.File_radio_bttn, 12, 0, 1, 1)
+
+        self.File_LE = QLineEdit(self.centralwidget)
+        self.File_LE.setObjectName(u"File_LE")
+        self.gridLayout.addWidget(self.File_LE, 12, 1, 1, 1)
+
+        self.File_Bttn = QPushButton(self.centralwidget)
+        self.File_Bttn.setObjectName(u"File_Bttn")
+        self.gridLayout.addWidget(self.File_Bttn, 12, 2, 1, 1)
+
+        self.Synthetic_radio_bttn = QRadioButton(self.centralwidget)
+        self.Synthetic_radio_bttn.setObjectName(u"Synthetic_radio_bttn")
+        self.gridLayout.addWidget(self.Synthetic_radio_bttn, 14, 0, 1, 1)
+
+        self.SpeedLabel = QLabel(self.centralwidget)
+        self.SpeedLabel.setObjectName(u"SpeedLabel")
+        self.gridLayout.addWidget(self.SpeedLabel, 13, 0, 1, 1)
+
+        self.SpeedSpin = QDoubleSpinBox(self.centralwidget)
+        self.SpeedSpin.setObjectName(u"SpeedSpin")
+        self.SpeedSpin.setFixedWidth(150)
+        self.gridLayout.addWidget(self.SpeedSpin, 13, 1, 1, 1)
+
+        self.Async_CheckBox = QCheckBox(self.centralwidget)
+        self.Async_CheckBox.setObjectName(u"Async_CheckBox")
+        self.gridLayout.addWidget(self.Async_CheckBox, 19, 4, 1, 2)
+
+        self.Process_CheckBox = QCheckBox(self.centralwidget)
+        self.Process_CheckBox.setObjectName(u"Process_CheckBox")
+        self.gridLayout.addWidget(self.Process_CheckBox, 20, 4, 1, 2)
         MainWindow.setCentralWidget(self.centralwidget)
 
         self.statusbar = QStatusBar(MainWindow)
@@ -221,4 +254,10 @@ class Ui_MainWindow(object):
         self.Serial_radiobttn.setText(QCoreApplication.translate("MainWindow", u"Serial", None))
         self.label_9.setText(QCoreApplication.translate("MainWindow", u"Number of Channels ", None))
         self.FsLabel.setText(QCoreApplication.translate("MainWindow",u"Frequecy [Hz] ",None))
+        self.File_radio_bttn.setText(QCoreApplication.translate("MainWindow", u"Replay file", None))
+        self.File_Bttn.setText(QCoreApplication.translate("MainWindow", u"Browse", None))
+        self.Synthetic_radio_bttn.setText(QCoreApplication.translate("MainWindow", u"Synthetic signal", None))
+        self.SpeedLabel.setText(QCoreApplication.translate("MainWindow", u"Replay speed", None))
+        self.Async_CheckBox.setText(QCoreApplication.translate("MainWindow", u"Pipelined DB queries", None))
+        self.Process_CheckBox.setText(QCoreApplication.translate("MainWindow", u"Run plots in separate processes", None))
     # retranslateUi
\ No newline at end of file